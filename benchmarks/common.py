@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import typing
+
+SAMPLE_PERCENTILES = (50, 95, 99)
+
+
+def percentile(ordered: typing.Sequence[float], percent: float) -> float:
+    if not ordered:
+        return 0.0
+
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(benchmark: str, samples: list[float], **params: typing.Any) -> dict[str, typing.Any]:
+    """Summarize timings in seconds into a json friendly result row, the values are in microseconds."""
+    ordered = sorted(samples)
+    total = sum(ordered)
+    result = {
+        "benchmark": benchmark,
+        **params,
+        "iterations": len(ordered),
+        "mean_us": statistics.fmean(ordered) * 1e6 if ordered else 0.0,
+    }
+    for percent in SAMPLE_PERCENTILES:
+        result[f"p{percent}_us"] = percentile(ordered, percent) * 1e6
+    result["max_us"] = ordered[-1] * 1e6 if ordered else 0.0
+    result["ops_per_sec"] = len(ordered) / total if total else 0.0
+    return result
+
+
+def measure(
+        func: typing.Callable[[], typing.Any], *, iterations: int, warmup: int = 3
+) -> list[float]:
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def measure_async(
+        func: typing.Callable[[], typing.Awaitable[typing.Any]], *, iterations: int, warmup: int = 3
+) -> list[float]:
+    for _ in range(warmup):
+        await func()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def git_revision() -> str | None:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=True
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def metadata(suite: str, args: argparse.Namespace) -> dict[str, typing.Any]:
+    return {
+        "suite": suite,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        # connection strings can hold passwords.
+        "arguments": {key: value for key, value in vars(args).items() if key != "output" and not key.endswith("dsn")},
+    }
+
+
+def int_list(value: str) -> list[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def make_parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--output", "-o", help="Write the json results to this file instead of stdout.")
+    parser.add_argument("--iterations", type=int, default=200, help="Timed calls per benchmark.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated data.")
+    return parser
+
+
+def emit(suite: str, args: argparse.Namespace, results: list[dict[str, typing.Any]]) -> None:
+    document = {"meta": metadata(suite, args), "results": results}
+    text = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+        print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+def progress(message: str) -> None:
+    print(message, file=sys.stderr, flush=True)
+
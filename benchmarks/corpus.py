@@ -0,0 +1,166 @@
+"""Synthetic emoji images with labelled near-duplicates, so duplicate detection can be scored."""
+from __future__ import annotations
+
+import io
+import random
+import typing
+
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter
+
+SIZE = 128
+FRAMES = 4
+Transform = typing.Callable[[Image.Image, random.Random], Image.Image]
+
+
+class CorpusImage:
+    __slots__ = ('group', 'variant', 'format', 'data')
+
+    def __init__(self, group: int, variant: str, image_format: str, data: bytes) -> None:
+        self.group: int = group
+        self.variant: str = variant
+        self.format: str = image_format
+        self.data: bytes = data
+
+    @property
+    def is_original(self) -> bool:
+        return self.variant == 'original'
+
+
+def random_colour(rng: random.Random) -> tuple[int, int, int, int]:
+    return rng.randrange(256), rng.randrange(256), rng.randrange(256), 255
+
+
+def draw_shapes(image: Image.Image, rng: random.Random, shapes: int) -> None:
+    draw = ImageDraw.Draw(image)
+    for _ in range(shapes):
+        x1, y1 = rng.randrange(SIZE), rng.randrange(SIZE)
+        x2, y2 = rng.randrange(SIZE), rng.randrange(SIZE)
+        box = (min(x1, x2), min(y1, y2), max(x1, x2) + 8, max(y1, y2) + 8)
+        kind = rng.randrange(4)
+        if kind == 0:
+            draw.ellipse(box, fill=random_colour(rng))
+        elif kind == 1:
+            draw.rectangle(box, fill=random_colour(rng))
+        elif kind == 2:
+            points = [(rng.randrange(SIZE), rng.randrange(SIZE)) for _ in range(rng.randint(3, 6))]
+            draw.polygon(points, fill=random_colour(rng))
+        else:
+            draw.line(box, fill=random_colour(rng), width=rng.randint(3, 12))
+
+
+def base_image(rng: random.Random) -> Image.Image:
+    image = Image.new("RGBA", (SIZE, SIZE), random_colour(rng))
+    draw_shapes(image, rng, rng.randint(3, 9))
+    return image
+
+
+def sibling_image(image: Image.Image, rng: random.Random) -> Image.Image:
+    """Same picture with a part redrawn, a different emoji that a naive threshold could confuse."""
+    sibling = image.copy()
+    draw_shapes(sibling, rng, 2)
+    return sibling
+
+
+def resized(image: Image.Image, rng: random.Random) -> Image.Image:
+    return image.resize((SIZE // 2, SIZE // 2)).resize((SIZE, SIZE))
+
+
+def scaled(image: Image.Image, rng: random.Random) -> Image.Image:
+    return image.resize((rng.choice((48, 64, 96)),) * 2)
+
+
+def brightened(image: Image.Image, rng: random.Random) -> Image.Image:
+    return ImageEnhance.Brightness(image).enhance(rng.uniform(.8, 1.2))
+
+
+def cropped(image: Image.Image, rng: random.Random) -> Image.Image:
+    border = rng.randint(2, 8)
+    return image.crop((border, border, SIZE - border, SIZE - border)).resize((SIZE, SIZE))
+
+
+def padded(image: Image.Image, rng: random.Random) -> Image.Image:
+    border = rng.randint(4, 12)
+    canvas = Image.new("RGBA", (SIZE + border * 2, SIZE + border * 2), (0, 0, 0, 0))
+    canvas.paste(image, (border, border))
+    return canvas.resize((SIZE, SIZE))
+
+
+def noisy(image: Image.Image, rng: random.Random) -> Image.Image:
+    noisy_image = image.copy()
+    pixels = noisy_image.load()
+    for _ in range(SIZE * SIZE // 50):
+        pixels[rng.randrange(SIZE), rng.randrange(SIZE)] = random_colour(rng)
+    return noisy_image
+
+
+def blurred(image: Image.Image, rng: random.Random) -> Image.Image:
+    return image.filter(ImageFilter.GaussianBlur(rng.uniform(.5, 1.5)))
+
+
+def stickered(image: Image.Image, rng: random.Random) -> Image.Image:
+    stickered_image = image.copy()
+    corner = rng.choice((0, SIZE - 24))
+    ImageDraw.Draw(stickered_image).ellipse((corner, corner, corner + 24, corner + 24), fill=random_colour(rng))
+    return stickered_image
+
+
+TRANSFORMS: dict[str, Transform] = {
+    'resized': resized,
+    'scaled': scaled,
+    'brightened': brightened,
+    'cropped': cropped,
+    'padded': padded,
+    'noisy': noisy,
+    'blurred': blurred,
+    'stickered': stickered,
+}
+
+
+def encode(frames: list[Image.Image], image_format: str) -> bytes:
+    buffer = io.BytesIO()
+    if image_format == 'GIF':
+        frames[0].save(buffer, format='GIF', save_all=True, append_images=frames[1:], duration=80, loop=0)
+    else:
+        frames[0].save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def animate(image: Image.Image, rng: random.Random) -> list[Image.Image]:
+    frames = [image]
+    for _ in range(FRAMES - 1):
+        frame = frames[-1].copy()
+        draw_shapes(frame, rng, 1)
+        frames.append(frame)
+    return frames
+
+
+def generate(
+        groups: int, *, seed: int = 0, gif_ratio: float = .2, siblings: float = .1,
+        transforms: typing.Iterable[str] | None = None
+) -> list[CorpusImage]:
+    """Every group is one original emoji with a variant per transform, variants share the group of their original.
+
+    Siblings are new groups derived from an existing picture, they should not be detected as duplicates.
+    A format variant re-encodes the original as the other format, like an emoji that was stolen and re-uploaded.
+    """
+    rng = random.Random(seed)
+    selected = {name: TRANSFORMS[name] for name in (transforms or TRANSFORMS)}
+    corpus: list[CorpusImage] = []
+    originals: list[Image.Image] = []
+    for group in range(groups):
+        if originals and rng.random() < siblings:
+            image = sibling_image(rng.choice(originals), rng)
+        else:
+            image = base_image(rng)
+        originals.append(image)
+
+        image_format = 'GIF' if rng.random() < gif_ratio else 'PNG'
+        frames = animate(image, rng) if image_format == 'GIF' else [image]
+        corpus.append(CorpusImage(group, 'original', image_format, encode(frames, image_format)))
+        other_format = 'PNG' if image_format == 'GIF' else 'GIF'
+        corpus.append(CorpusImage(group, 'format', other_format, encode(frames[:1], other_format)))
+        for name, transform in selected.items():
+            variant_seed = rng.random()  # every frame of a variant gets the same changes.
+            variant = [transform(frame, random.Random(variant_seed)) for frame in frames]
+            corpus.append(CorpusImage(group, name, image_format, encode(variant, image_format)))
+    return corpus
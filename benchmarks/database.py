@@ -0,0 +1,175 @@
+"""Benchmarks the database backends under a mix of the queries the bot makes, at several concurrencies.
+
+    python -m benchmarks.database --concurrency 1,8,32 --seconds 10 -o database.json
+    python -m benchmarks.database --postgres-dsn postgresql://localhost/stemoji_bench
+
+Postgres runs write into the tables of the given database, point it to a scratch database.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import typing
+
+from benchmarks.common import make_parser, int_list, summarize, emit, progress
+from core.db import DbManager, DbPostgres, DbSqlite
+
+USER_BASE = 10 ** 15
+EMOJI_BASE = 10 ** 17
+DEFAULT_MIX = {
+    'upsert_emoji_usage': 50,
+    'fetch_user_usages': 20,
+    'list_emoji_favourite': 15,
+    'create_user': 10,
+    'bulk_update_emoji_names': 5,
+}
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise ValueError(f"Unknown operation {name}, choose from {', '.join(DEFAULT_MIX)}.")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+class Workload:
+    """Picks operations by weight against a seeded catalogue, favouring a hot set of users like real traffic."""
+
+    def __init__(self, db: DbManager, emojis: int, users: int, mix: dict[str, int], seed: int) -> None:
+        self.db: DbManager = db
+        self.emoji_ids: list[int] = [EMOJI_BASE + index for index in range(emojis)]
+        self.user_ids: list[int] = [USER_BASE + index for index in range(users)]
+        self.operations: list[str] = [*mix]
+        self.weights: list[int] = [*mix.values()]
+        self.rng: random.Random = random.Random(seed)
+        self.renamed: int = 0
+        self.new_users: int = users
+
+    def user(self) -> int:
+        hot = max(1, len(self.user_ids) // 10)
+        if self.rng.random() < .8:
+            return self.user_ids[self.rng.randrange(hot)]
+        return self.rng.choice(self.user_ids)
+
+    async def seed(self, *, usages_per_user: int = 10, favourites_per_user: int = 3) -> None:
+        db = self.db
+        await db.bulk_create_users(self.user_ids)
+        await db.bulk_create_emojis([
+            (emoji_id, f"bench{index}", self.rng.choice(self.user_ids), f"{self.rng.getrandbits(64):016x}")
+            for index, emoji_id in enumerate(self.emoji_ids)
+        ])
+        usages = {
+            (emoji_id, user_id): self.rng.randint(1, 500)
+            for user_id in self.user_ids
+            for emoji_id in self.rng.sample(self.emoji_ids, min(usages_per_user, len(self.emoji_ids)))
+        }
+        await db.bulk_upsert_emoji_usage([(*key, amount) for key, amount in usages.items()])
+        for user_id in self.user_ids[:max(1, len(self.user_ids) // 10)]:
+            for emoji_id in self.rng.sample(self.emoji_ids, min(favourites_per_user, len(self.emoji_ids))):
+                await db.create_emoji_favourite(emoji_id, user_id)
+
+    async def run_operation(self, operation: str) -> None:
+        db = self.db
+        if operation == 'upsert_emoji_usage':
+            await db.upsert_emoji_usage(self.rng.choice(self.emoji_ids), self.user(), self.rng.randint(1, 3))
+        elif operation == 'fetch_user_usages':
+            await db.fetch_user_usages(self.user())
+        elif operation == 'list_emoji_favourite':
+            await db.list_emoji_favourite(self.user())
+        elif operation == 'create_user':
+            if self.rng.random() < .5:
+                await db.create_user(self.user())  # already exists, like most ensure_user calls.
+            else:
+                self.new_users += 1
+                await db.create_user(USER_BASE + self.new_users)
+        elif operation == 'bulk_update_emoji_names':
+            self.renamed += 1
+            emojis = self.rng.sample(self.emoji_ids, min(10, len(self.emoji_ids)))
+            await db.bulk_update_emoji_names([
+                (emoji_id, f"bench{emoji_id - EMOJI_BASE}_{self.renamed}") for emoji_id in emojis
+            ])
+
+    async def worker(self, deadline: float, latencies: dict[str, list[float]]) -> None:
+        while time.perf_counter() < deadline:
+            operation = self.rng.choices(self.operations, self.weights)[0]
+            start = time.perf_counter()
+            await self.run_operation(operation)
+            latencies[operation].append(time.perf_counter() - start)
+
+    async def run(self, concurrency: int, seconds: float) -> tuple[dict[str, list[float]], float]:
+        latencies: dict[str, list[float]] = {operation: [] for operation in self.operations}
+        start = time.perf_counter()
+        await asyncio.gather(*(self.worker(start + seconds, latencies) for _ in range(concurrency)))
+        return latencies, time.perf_counter() - start
+
+
+async def bench_backend(name: str, db: DbManager, args: argparse.Namespace) -> list[dict[str, typing.Any]]:
+    results = []
+    async with db:
+        await db.init_database()
+        workload = Workload(db, args.emojis, args.users, args.mix, args.seed)
+        progress(f"[{name}] seeding {args.emojis} emojis and {args.users} users.")
+        await workload.seed()
+        for concurrency in args.concurrency:
+            progress(f"[{name}] running for {args.seconds}s with {concurrency} concurrent callers.")
+            db.query_stats.clear()
+            latencies, wall = await workload.run(concurrency, args.seconds)
+            params = {"backend": name, "concurrency": concurrency}
+            total = 0
+            for operation, samples in latencies.items():
+                if not samples:
+                    continue
+
+                total += len(samples)
+                row = summarize(operation, samples, **params)
+                row["throughput"] = len(samples) / wall
+                if (stat := db.query_stats.get(operation)) is not None:
+                    row["pool_wait_mean_us"] = stat.pool_wait / stat.calls * 1e6
+                results.append(row)
+
+            every = [sample for samples in latencies.values() for sample in samples]
+            row = summarize("all", every, **params)
+            row["throughput"] = total / wall  # ops/sec across every caller, unlike ops_per_sec which is per caller.
+            results.append(row)
+    return results
+
+
+async def main() -> None:
+    parser = make_parser("Benchmarks DbSqlite and DbPostgres with a mix of the bot's queries.")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 8, 32], help="Concurrent callers.")
+    parser.add_argument("--seconds", type=float, default=10, help="Duration of each concurrency run.")
+    parser.add_argument("--emojis", type=int, default=2000, help="Emojis in the seeded catalogue.")
+    parser.add_argument("--users", type=int, default=10000, help="Users in the seeded catalogue.")
+    parser.add_argument(
+        "--mix", type=parse_mix, default=DEFAULT_MIX,
+        help="Weighted operations, such as upsert_emoji_usage=50,fetch_user_usages=20."
+    )
+    parser.add_argument("--sqlite-path", help="New SQLite file to use, defaults to a temporary file that is removed.")
+    parser.add_argument(
+        "--postgres-dsn", default=os.environ.get("BENCHMARK_POSTGRES_DSN"),
+        help="Also benchmark postgres on this database. Defaults to BENCHMARK_POSTGRES_DSN."
+    )
+    parser.add_argument("--skip-sqlite", action="store_true", help="Only benchmark postgres.")
+    args = parser.parse_args()
+
+    results = []
+    if not args.skip_sqlite:
+        with tempfile.TemporaryDirectory() as directory:
+            path = args.sqlite_path or os.path.join(directory, "bench.db")
+            results.extend(await bench_backend("sqlite", DbSqlite(path), args))
+
+    if args.postgres_dsn:
+        results.extend(await bench_backend("postgres", DbPostgres(args.postgres_dsn), args))
+
+    emit("database", args, results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,165 @@
+"""Benchmarks image hashing and duplicate detection over a synthetic corpus with labelled near-duplicates.
+
+    python -m benchmarks.duplicates --groups 200 --catalogue 100,500,2000,5000 -o duplicates.json
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import itertools
+import random
+import time
+import typing
+
+from benchmarks.common import make_parser, int_list, measure_async, summarize, emit, progress
+from benchmarks.corpus import CorpusImage, generate
+from benchmarks.fakes import FakeBot, FakeEmoji
+from core.client import DUPLICATE_THRESHOLD
+from core.models import PersonalEmoji, compute_image_hash
+
+MAX_DISTANCE = 64  # bits in a phash.
+
+
+def hash_bits(image: CorpusImage) -> int:
+    return int(str(compute_image_hash(image.data)), 16)
+
+
+async def bench_hash_throughput(
+        corpus: list[CorpusImage], workers: list[int], **params: typing.Any
+) -> list[dict[str, typing.Any]]:
+    loop = asyncio.get_running_loop()
+    datas = [image.data for image in corpus]
+    results = []
+
+    def row(mode: str, worker_count: int, taken: float) -> dict[str, typing.Any]:
+        return {
+            "benchmark": f"hash.{mode}", **params, "workers": worker_count, "images": len(datas),
+            "seconds": taken, "images_per_sec": len(datas) / taken if taken else 0.0,
+        }
+
+    start = time.perf_counter()
+    for data in datas:
+        compute_image_hash(data)
+    results.append(row("inline", 1, time.perf_counter() - start))
+
+    for worker_count in workers:
+        with concurrent.futures.ThreadPoolExecutor(worker_count) as executor:
+            loop.set_default_executor(executor)  # to_byte_hash runs on asyncio.to_thread.
+            start = time.perf_counter()
+            await asyncio.gather(*map(PersonalEmoji.to_byte_hash, datas))
+            results.append(row("threads", worker_count, time.perf_counter() - start))
+
+        with concurrent.futures.ProcessPoolExecutor(worker_count) as executor:
+            # workers pay for spawning and importing imagehash on their first task, which is not measured.
+            await asyncio.gather(*(
+                loop.run_in_executor(executor, compute_image_hash, datas[0]) for _ in range(worker_count)
+            ))
+            start = time.perf_counter()
+            await asyncio.gather(*(loop.run_in_executor(executor, compute_image_hash, data) for data in datas))
+            results.append(row("processes", worker_count, time.perf_counter() - start))
+
+    loop.set_default_executor(concurrent.futures.ThreadPoolExecutor())
+    return results
+
+
+def distance_histograms(corpus: list[CorpusImage], hashes: list[int]) -> tuple[list[int], list[int]]:
+    """Counts of every image pair by distance, split into pairs of the same emoji and pairs of different emojis."""
+    same = [0] * (MAX_DISTANCE + 1)
+    different = [0] * (MAX_DISTANCE + 1)
+    for (left, left_hash), (right, right_hash) in itertools.combinations(zip(corpus, hashes), 2):
+        distance = (left_hash ^ right_hash).bit_count()
+        if left.group == right.group:
+            same[distance] += 1
+        else:
+            different[distance] += 1
+    return same, different
+
+
+def score_thresholds(same: list[int], different: list[int], **params: typing.Any) -> list[dict[str, typing.Any]]:
+    results = []
+    total_same = sum(same)
+    for threshold in range(1, MAX_DISTANCE + 1):
+        true_positive = sum(same[:threshold])  # distances under the threshold are reported as duplicates.
+        false_positive = sum(different[:threshold])
+        false_negative = total_same - true_positive
+        precision = true_positive / (true_positive + false_positive) if true_positive + false_positive else 1.0
+        recall = true_positive / total_same if total_same else 1.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        results.append({
+            "benchmark": "duplicates.threshold", **params, "threshold": threshold,
+            "current": threshold == DUPLICATE_THRESHOLD, "precision": precision, "recall": recall, "f1": f1,
+            "true_positive": true_positive, "false_positive": false_positive, "false_negative": false_negative,
+        })
+    return results
+
+
+def score_variants(corpus: list[CorpusImage], hashes: list[int], **params: typing.Any) -> list[dict[str, typing.Any]]:
+    """How far each kind of edit moves the hash from its original, and whether it's still caught."""
+    originals = {image.group: bits for image, bits in zip(corpus, hashes) if image.is_original}
+    distances: dict[str, list[int]] = {}
+    for image, bits in zip(corpus, hashes):
+        if not image.is_original:
+            distances.setdefault(image.variant, []).append((bits ^ originals[image.group]).bit_count())
+
+    return [
+        {
+            "benchmark": "duplicates.variant", **params, "variant": variant, "threshold": DUPLICATE_THRESHOLD,
+            "recall": sum(distance < DUPLICATE_THRESHOLD for distance in values) / len(values),
+            "mean_distance": sum(values) / len(values), "max_distance": max(values),
+        }
+        for variant, values in sorted(distances.items())
+    ]
+
+
+async def bench_find_duplicates(
+        corpus: list[CorpusImage], hashes: list[int], sizes: list[int], iterations: int, seed: int
+) -> list[dict[str, typing.Any]]:
+    """Catalogues are the corpus originals, padded with random hashes since the scan doesn't care about content."""
+    rng = random.Random(seed)
+    originals = [bits for image, bits in zip(corpus, hashes) if image.is_original]
+    queries = itertools.cycle([image.data for image in corpus if not image.is_original])
+    results = []
+    for size in sizes:
+        bot = FakeBot()
+        for index in range(size):
+            bits = originals[index] if index < len(originals) else rng.getrandbits(MAX_DISTANCE)
+            emoji = bot.add_emoji(FakeEmoji(10 ** 17 + index, f"emoji{index}"), 1000)
+            emoji.generate_from_hash(f"{bits:016x}")
+
+        samples = await measure_async(lambda: bot.find_image_duplicates(next(queries)), iterations=iterations)
+        results.append(summarize("find_image_duplicates", samples, catalogue=size))
+
+    samples = await measure_async(lambda: PersonalEmoji.to_byte_hash(next(queries)), iterations=iterations)
+    results.append(summarize("hash.single", samples, catalogue=0))  # the part of every lookup that isn't the scan.
+    return results
+
+
+async def main() -> None:
+    parser = make_parser("Benchmarks image hashing throughput, duplicate lookups and the duplicate threshold.")
+    parser.add_argument("--groups", type=int, default=200, help="Original emojis, each gets a set of near-duplicates.")
+    parser.add_argument("--gif-ratio", type=float, default=.2, help="Share of originals that are animated.")
+    parser.add_argument("--siblings", type=float, default=.1, help="Share of originals derived from another one.")
+    parser.add_argument("--catalogue", type=int_list, default=[100, 500, 2000, 5000], help="Catalogue sizes.")
+    parser.add_argument("--workers", type=int_list, default=[1, 2, 4, 8], help="Thread and process pool sizes.")
+    args = parser.parse_args()
+
+    progress(f"Generating {args.groups} groups of images.")
+    corpus = generate(args.groups, seed=args.seed, gif_ratio=args.gif_ratio, siblings=args.siblings)
+    params = {"images": len(corpus), "groups": args.groups}
+
+    progress(f"Hashing {len(corpus)} images.")
+    results = await bench_hash_throughput(corpus, args.workers, groups=args.groups)
+    hashes = [hash_bits(image) for image in corpus]
+
+    progress("Scoring thresholds.")
+    same, different = distance_histograms(corpus, hashes)
+    results.extend(score_thresholds(same, different, **params))
+    results.extend(score_variants(corpus, hashes, **params))
+
+    progress("Timing duplicate lookups.")
+    results.extend(await bench_find_duplicates(corpus, hashes, args.catalogue, args.iterations, args.seed))
+    emit("duplicates", args, results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import random
+import time
+import typing
+
+import discord
+
+from core.client import StellaEmojiBot
+from core.models import PersonalEmoji, NormalEmoji
+from core.user_state import UserStateCache
+
+WORDS = (
+    'cat', 'dog', 'pepe', 'kek', 'sad', 'happy', 'blob', 'wave', 'think', 'cry', 'laugh', 'angry', 'pog', 'yes',
+    'no', 'love', 'heart', 'fire', 'cool', 'shrug', 'sleep', 'party', 'dance', 'clap', 'eyes', 'smug', 'hype',
+    'nod', 'wow', 'ok', 'sip', 'tea', 'salute', 'panic', 'pray', 'hug', 'pat', 'bonk', 'spin', 'vibe',
+)
+EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class FakeEmoji:
+    """Stands in for discord.Emoji with only the attributes that the bot reads."""
+    __slots__ = ('id', 'name', 'animated', 'created_at', 'image')
+
+    def __init__(self, emoji_id: int, name: str, *, animated: bool = False, image: bytes = b'') -> None:
+        self.id: int = emoji_id
+        self.name: str = name
+        self.animated: bool = animated
+        self.created_at: datetime.datetime = EPOCH + datetime.timedelta(minutes=emoji_id % 500_000)
+        self.image: bytes = image
+
+    @property
+    def url(self) -> str:
+        return f"https://cdn.discordapp.com/emojis/{self.id}.{'gif' if self.animated else 'png'}"
+
+    async def read(self) -> bytes:
+        return self.image
+
+    def __str__(self) -> str:
+        return f"<{'a' if self.animated else ''}:{self.name}:{self.id}>"
+
+
+class FakeNormalEmojis:
+    def __init__(self, names: typing.Iterable[str]) -> None:
+        self.mapping: dict[str, NormalEmoji] = {
+            name: NormalEmoji(name=name, unicode=chr(0x1F600 + index % 80)) for index, name in enumerate(names)
+        }
+        self.emojis: list[NormalEmoji] = [*self.mapping.values()]
+
+    def get(self, name: str) -> NormalEmoji | None:
+        return self.mapping.get(name)
+
+
+class FakeBot:
+    """Just enough of StellaEmojiBot for the emoji hot paths, the lookups are the bot's own methods."""
+    get_custom_emoji = StellaEmojiBot.get_custom_emoji
+    render_emoji_text = StellaEmojiBot.render_emoji_text
+    find_image_duplicates = StellaEmojiBot.find_image_duplicates
+    find_hash_duplicates = StellaEmojiBot.find_hash_duplicates
+
+    def __init__(self, *, owner_id: int = 1, max_users: int = 10000) -> None:
+        self.owner_id: int = owner_id
+        self.user_states: UserStateCache = UserStateCache(max_users=max_users)
+        self.user: discord.Object = discord.Object(owner_id)
+        self.emojis_users: dict[int, PersonalEmoji] = {}
+        self.emoji_names: dict[str, int] = {}
+        self.emoji_filled: asyncio.Event = asyncio.Event()
+        self.emoji_synced: asyncio.Event = asyncio.Event()
+        self.normal_emojis: FakeNormalEmojis = FakeNormalEmojis(f"{word}_face" for word in WORDS)
+        self._connection = None
+
+    def passive_bulk_user_usage(self, user: discord.abc.Snowflake) -> None:
+        return None  # everything is already in memory.
+
+    def passive_bulk_favourite_user(self, user: discord.abc.Snowflake) -> None:
+        return None
+
+    async def is_owner(self, user: discord.abc.Snowflake) -> bool:
+        return user.id == self.owner_id
+
+    def dispatch(self, event: str, /, *args: typing.Any, **kwargs: typing.Any) -> None:
+        pass
+
+    def add_emoji(self, emoji: FakeEmoji, added_by: int) -> PersonalEmoji:
+        personal = PersonalEmoji(self, emoji)  # type: ignore
+        personal.added_by = discord.Object(added_by)
+        self.emojis_users[emoji.id] = personal
+        self.emoji_names[emoji.name] = emoji.id
+        return personal
+
+    def cancel_usage_tasks(self) -> None:
+        """Usage flushes sleep before they write, there is no database here so they're dropped."""
+        for emoji in self.emojis_users.values():
+            for task in (emoji._update_tasks or {}).values():  # noqa
+                task.cancel()
+            emoji._update_tasks = emoji._recent_emoji_usage = None  # noqa
+
+
+class FakeInteraction:
+    def __init__(self, bot: FakeBot, user_id: int) -> None:
+        self.client: FakeBot = bot
+        self.user: discord.Object = discord.Object(user_id)
+
+
+def emoji_name(rng: random.Random, index: int) -> str:
+    name = "_".join(rng.sample(WORDS, rng.randint(1, 3)))
+    return f"{name}{index}"[:32]
+
+
+def build_bot(
+        emoji_count: int, user_count: int, *, seed: int = 0, usages_per_user: int = 10, favourites_per_user: int = 3
+) -> FakeBot:
+    """Catalogue of emojis with usage and favourites of users, user ids starts from 1000 and 1 is the owner."""
+    rng = random.Random(seed)
+    bot = FakeBot(max_users=user_count + 1)
+    users = range(1000, 1000 + user_count)
+    uploaders = users[:max(1, user_count // 20)]
+    emojis = [
+        bot.add_emoji(
+            FakeEmoji(10 ** 17 + index, emoji_name(rng, index), animated=rng.random() < .2),
+            rng.choice(uploaders)
+        )
+        for index in range(emoji_count)
+    ]
+
+    for user_id in users:
+        state = bot.user_states.get(user_id)
+        state.usage_loaded = state.favourite_loaded = time.monotonic()
+        for emoji in rng.sample(emojis, min(usages_per_user, emoji_count)):
+            emoji.set_usage(user_id, rng.randint(1, 500))
+        for emoji in rng.sample(emojis, min(favourites_per_user, emoji_count)):
+            emoji.set_favourite(user_id)
+
+    bot.emoji_filled.set()
+    bot.emoji_synced.set()
+    return bot
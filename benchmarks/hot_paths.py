@@ -0,0 +1,133 @@
+"""Benchmarks the emoji lookups that run on every autocomplete and message.
+
+    python -m benchmarks.hot_paths --emojis 100,500,2000,10000 --users 1000,10000,100000 -o hot_paths.json
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import random
+import typing
+
+from benchmarks.common import make_parser, int_list, measure, measure_async, summarize, emit, progress
+from benchmarks.fakes import build_bot, FakeBot, FakeInteraction, WORDS
+from core.errors import UserInputError
+from core.models import PersonalEmoji
+from utils.general import emoji_context
+from utils.parsers import find_latest_unpaired_semicolon
+
+UNPAIRED_TEXTS = (
+    ";pep",
+    "hello there ;wave; how are you ;sm",
+    "no emojis in this one at all, just a longer sentence that someone typed",
+    ";cat; ;dog; ;blob; ;pepe; ;kek; ;sad; ;happy; ;think",
+    "a; b; c; d; e; f; g; h; i; j; k; l; m; n; o; p; q; r; s; t; u; v; w; x; y; ;la",
+)
+
+
+def fuzzy_queries(bot: FakeBot, rng: random.Random, amount: int = 32) -> list[str]:
+    names = rng.sample([*bot.emoji_names], min(amount // 2, len(bot.emoji_names)))
+    queries = [name[:rng.randint(3, max(3, len(name)))] for name in names]  # partial names as they're typed
+    queries.extend(rng.choice(WORDS)[:rng.randint(2, 5)].upper() for _ in range(amount - len(queries)))
+    return queries
+
+
+def emoji_texts(bot: FakeBot, rng: random.Random, amount: int = 16) -> list[str]:
+    names = [*bot.emoji_names]
+    normal = [*bot.normal_emojis.mapping]
+    texts = []
+    for _ in range(amount):
+        parts = [f";{rng.choice(names)};" for _ in range(rng.randint(1, 5))]
+        parts.extend(f":{rng.choice(normal)}:" for _ in range(rng.randint(0, 2)))
+        parts.extend(rng.choice(WORDS) for _ in range(rng.randint(2, 12)))
+        parts.append(";missing_emoji;")
+        rng.shuffle(parts)
+        texts.append(" ".join(parts))
+    return texts
+
+
+async def bench_autocomplete(
+        bot: FakeBot, user_id: int, queries: list[str], iterations: int, **params: typing.Any
+) -> list[dict[str, typing.Any]]:
+    interaction = FakeInteraction(bot, user_id)
+    cases = {
+        "autocomplete.empty": dict(current=itertools.repeat("")),
+        "autocomplete.fuzzy": dict(current=itertools.cycle(queries)),
+        "autocomplete.owner_only": dict(current=itertools.cycle(["", *queries[:3]]), owner_only=True),
+        "autocomplete.fav_only": dict(current=itertools.cycle(["", *queries[:3]]), fav_only=True),
+    }
+    results = []
+    for name, case in cases.items():
+        current = case.pop("current")
+
+        async def call():
+            await PersonalEmoji.autocomplete(interaction, next(current), **case)  # noqa: B023
+
+        results.append(summarize(name, await measure_async(call, iterations=iterations), **params))
+    return results
+
+
+async def bench_converter(
+        bot: FakeBot, rng: random.Random, iterations: int, **params: typing.Any
+) -> list[dict[str, typing.Any]]:
+    emojis = [*bot.emojis_users.values()]
+    ids = itertools.cycle([str(emoji.id) for emoji in rng.sample(emojis, min(32, len(emojis)))])
+    names = itertools.cycle([emoji.name for emoji in rng.sample(emojis, min(32, len(emojis)))])
+    cases = {
+        "converting_emoji.id": ids,
+        "converting_emoji.name": names,
+        "converting_emoji.missing": itertools.repeat("not_an_emoji_name"),
+    }
+    results = []
+    for name, arguments in cases.items():
+        async def call():
+            try:
+                await PersonalEmoji.converting_emoji(bot, next(arguments))  # noqa: B023
+            except UserInputError:
+                pass
+
+        results.append(summarize(name, await measure_async(call, iterations=iterations), **params))
+    return results
+
+
+def bench_text(bot: FakeBot, user_id: int, texts: list[str], iterations: int, **params: typing.Any) -> dict:
+    emoji_context.set(FakeInteraction(bot, user_id).user)
+    cycle = itertools.cycle(texts)
+    samples = measure(lambda: bot.render_emoji_text(next(cycle)), iterations=iterations)
+    bot.cancel_usage_tasks()
+    return summarize("emoji_text.render", samples, **params)
+
+
+def bench_unpaired(iterations: int) -> list[dict[str, typing.Any]]:
+    results = []
+    for text in UNPAIRED_TEXTS:
+        samples = measure(lambda: find_latest_unpaired_semicolon(text), iterations=iterations)  # noqa: B023
+        results.append(summarize("find_latest_unpaired_semicolon", samples, length=len(text)))
+    return results
+
+
+async def main() -> None:
+    parser = make_parser("Benchmarks PersonalEmoji autocomplete, conversion and /emoji text substitution.")
+    parser.add_argument("--emojis", type=int_list, default=[100, 500, 2000, 10000], help="Catalogue sizes.")
+    parser.add_argument("--users", type=int_list, default=[1000, 10000, 100000], help="Users with usage data.")
+    parser.add_argument("--usages-per-user", type=int, default=10, help="Distinct emojis each user has used.")
+    args = parser.parse_args()
+
+    results = bench_unpaired(args.iterations)
+    for emoji_count, user_count in itertools.product(args.emojis, args.users):
+        progress(f"Building {emoji_count} emojis with {user_count} users.")
+        rng = random.Random(args.seed)
+        bot = build_bot(emoji_count, user_count, seed=args.seed, usages_per_user=args.usages_per_user)
+        user_id = 1000  # an uploader that has usages and favourites.
+        params = {"emojis": emoji_count, "users": user_count}
+
+        results.extend(await bench_autocomplete(bot, user_id, fuzzy_queries(bot, rng), args.iterations, **params))
+        results.extend(await bench_converter(bot, rng, args.iterations, **params))
+        results.append(bench_text(bot, user_id, emoji_texts(bot, rng), args.iterations, **params))
+        del bot
+
+    emit("hot_paths", args, results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,257 @@
+"""Runs the real bot against benchmarks.mock_discord and measures interactions end to end, no network needed.
+
+    python -m benchmarks.load --emojis 2000 --users 10000 --concurrency 16,64,256 --seconds 20 -o load.json
+
+Every virtual user dispatches an interaction over the gateway and waits for the bot to answer it before sending
+the next one. An interaction is done on its first non deferred response or its first followup message.
+The mock server shares the event loop with the bot, so its own overhead is part of the measured latency.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import collections
+import itertools
+import logging
+import os
+import random
+import tempfile
+import time
+import typing
+
+import aiohttp
+import discord
+
+from benchmarks.common import make_parser, int_list, summarize, emit, progress
+from benchmarks.fakes import emoji_name
+from benchmarks.mock_discord import MockDiscord, InteractionTiming, APPLICATION_ID, interaction_payload, \
+    message_with_emoji
+
+USER_BASE = 10 ** 15
+EMOJI_BASE = 10 ** 17
+DEFAULT_MIX = {'e': 60, 'text_autocomplete': 35, 'steal': 5}
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise ValueError(f"Unknown interaction {name}, choose from {', '.join(DEFAULT_MIX)}.")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+def configure_environment(directory: str) -> None:
+    """The bot reads its configuration from the environment, these override anything in .env."""
+    os.environ.update({
+        "BOT_TOKEN": "mock.token.for.load.testing",
+        "TEXT_COMMAND_PREFIX": "stemoji",
+        "TEXT_COMMAND_PREFIX_MENTION": "TRUE",
+        "MESSAGE_CONTENT_INTENTS": "FALSE",
+        "MEMBERS_INTENTS": "FALSE",
+        "OWNER_ONLY": "FALSE",
+        "MIRROR_PROFILE": "FALSE",
+        "DATABASE": "sqlite",
+        "DATABASE_DSN": os.path.join(directory, "load.db"),
+        "EMOJI_SNAPSHOT_PATH": os.path.join(directory, "emoji_snapshot.json"),
+        "METRICS_PORT": "",
+    })
+
+
+class Catalogue:
+    def __init__(self, emojis: int, users: int, seed: int) -> None:
+        self.rng: random.Random = random.Random(seed)
+        self.emojis: dict[int, str] = {EMOJI_BASE + index: emoji_name(self.rng, index) for index in range(emojis)}
+        self.user_ids: list[int] = [USER_BASE + index for index in range(users)]
+
+    async def seed(self, mock: MockDiscord, path: str, *, usages_per_user: int = 10) -> None:
+        """Emojis exist on the mock and in the database with their hashes, so the bot starts without rehashing."""
+        from core.db import DbSqlite
+
+        for emoji_id, name in self.emojis.items():
+            mock.add_emoji(emoji_id, name)
+
+        rng = self.rng
+        emoji_ids = [*self.emojis]
+        async with DbSqlite(path) as db:
+            await db.init_database()
+            await db.bulk_create_users([APPLICATION_ID, *self.user_ids])
+            await db.bulk_create_emojis([
+                (emoji_id, name, rng.choice(self.user_ids), f"{rng.getrandbits(64):016x}")
+                for emoji_id, name in self.emojis.items()
+            ])
+            usages = {
+                (emoji_id, user_id): rng.randint(1, 500)
+                for user_id in self.user_ids
+                for emoji_id in rng.sample(emoji_ids, min(usages_per_user, len(emoji_ids)))
+            }
+            await db.bulk_upsert_emoji_usage([(*key, amount) for key, amount in usages.items()])
+
+
+class LoadGenerator:
+    def __init__(self, mock: MockDiscord, catalogue: Catalogue, mix: dict[str, int], timeout: float) -> None:
+        self.mock: MockDiscord = mock
+        self.catalogue: Catalogue = catalogue
+        self.kinds: list[str] = [*mix]
+        self.weights: list[int] = [*mix.values()]
+        self.timeout: float = timeout
+        self.rng: random.Random = random.Random(catalogue.rng.random())
+        self.emojis: list[tuple[int, str]] = [*catalogue.emojis.items()]
+        self._tokens = itertools.count()
+
+    def user(self) -> int:
+        return self.rng.choice(self.catalogue.user_ids)
+
+    def emoji(self) -> tuple[int, str]:
+        return self.rng.choice(self.emojis)
+
+    def payload(self, kind: str, token: str) -> dict[str, typing.Any]:
+        user_id = self.user()
+        command_id = str(self.mock.snowflake())
+        if kind == 'e':
+            emoji_id, name = self.emoji()
+            value = str(emoji_id) if self.rng.random() < .5 else name
+            option = {"name": "emoji", "type": 3, "value": value}
+            data = {"id": command_id, "name": "e", "type": 1, "options": [option]}
+            return interaction_payload(self.mock, token, user_id, 2, data)
+
+        if kind == 'text_autocomplete':
+            _, name = self.emoji()
+            typed = f"hello ;{name[:self.rng.randint(1, len(name))]}"
+            option = {"name": "text", "type": 3, "value": typed, "focused": True}
+            data = {
+                "id": command_id, "name": "emoji", "type": 1,
+                "options": [{"name": "text", "type": 1, "options": [option]}],
+            }
+            return interaction_payload(self.mock, token, user_id, 4, data)
+
+        # a message with an emoji the bot doesn't have yet, the mock cdn generates its image.
+        message = message_with_emoji(self.mock, user_id, self.mock.snowflake(), f"stolen{token}")
+        data = {
+            "id": command_id, "name": "Steal Emoji", "type": 3, "target_id": message["id"],
+            "resolved": {"messages": {message["id"]: message}},
+        }
+        return interaction_payload(self.mock, token, user_id, 2, data)
+
+    async def virtual_user(
+            self, deadline: float, finished: list[InteractionTiming], timeouts: collections.Counter
+    ) -> None:
+        while time.perf_counter() < deadline:
+            kind = self.rng.choices(self.kinds, self.weights)[0]
+            token = f"t{next(self._tokens)}"
+            payload = self.payload(kind, token)
+            timing = self.mock.timings[token] = InteractionTiming(kind)
+            try:
+                await self.mock.dispatch("INTERACTION_CREATE", payload)
+                await asyncio.wait_for(asyncio.shield(timing.done), self.timeout)
+            except asyncio.TimeoutError:
+                timeouts[kind] += 1
+            else:
+                finished.append(timing)
+            finally:
+                del self.mock.timings[token]
+
+    async def run(self, concurrency: int, seconds: float) -> tuple[list[InteractionTiming], collections.Counter, float]:
+        finished: list[InteractionTiming] = []
+        timeouts: collections.Counter[str] = collections.Counter()
+        start = time.perf_counter()
+        deadline = start + seconds
+        await asyncio.gather(*(self.virtual_user(deadline, finished, timeouts) for _ in range(concurrency)))
+        return finished, timeouts, time.perf_counter() - start
+
+
+def summarize_run(
+        finished: list[InteractionTiming], timeouts: collections.Counter, wall: float, concurrency: int
+) -> list[dict[str, typing.Any]]:
+    results = []
+    by_kind: dict[str, list[InteractionTiming]] = collections.defaultdict(list)
+    for timing in finished:
+        by_kind[timing.kind].append(timing)
+
+    for kind in sorted({*by_kind, *timeouts}):
+        timings = by_kind.get(kind, [])
+        row = summarize(kind, [timing.completed - timing.sent for timing in timings], concurrency=concurrency)
+        acked = summarize(kind, [timing.acked - timing.sent for timing in timings])
+        row.update(
+            ack_p50_us=acked["p50_us"], ack_p99_us=acked["p99_us"], timeouts=timeouts[kind],
+            throughput=len(timings) / wall,
+        )
+        results.append(row)
+
+    row = summarize("all", [timing.completed - timing.sent for timing in finished], concurrency=concurrency)
+    row.update(timeouts=sum(timeouts.values()), throughput=len(finished) / wall)
+    results.append(row)
+    return results
+
+
+async def wait_until_synced(bot: typing.Any, timeout: float) -> None:
+    """sync_emojis hydrates every emoji from the database after emoji_synced is set."""
+    await asyncio.wait_for(bot.emoji_synced.wait(), timeout)
+    deadline = time.perf_counter() + timeout
+    while any(emoji.db_data is None for emoji in bot.emojis_users.values()):
+        if time.perf_counter() > deadline:
+            raise RuntimeError("The bot did not finish syncing emojis.")
+        await asyncio.sleep(.1)
+
+
+async def run_bot(args: argparse.Namespace, directory: str) -> list[dict[str, typing.Any]]:
+    configure_environment(directory)
+    mock = MockDiscord(port=args.port)
+    await mock.start()
+    mock.patch_client()
+    catalogue = Catalogue(args.emojis, args.users, args.seed)
+    progress(f"Seeding {args.emojis} emojis and {args.users} users.")
+    await catalogue.seed(mock, os.environ["DATABASE_DSN"])
+
+    import main as entrypoint  # the bot with every command that is registered when it runs normally.
+    bot = entrypoint.bot
+    results = []
+    try:
+        async with bot, bot.db, aiohttp.ClientSession() as bot.session:
+            runner = asyncio.create_task(bot.start(os.environ["BOT_TOKEN"]))
+            progress("Waiting for the bot to be ready.")
+            await asyncio.wait_for(bot.wait_until_ready(), args.startup_timeout)
+            await asyncio.wait_for(bot._extension_loaded.wait(), args.startup_timeout)  # noqa
+            await wait_until_synced(bot, args.startup_timeout)
+
+            generator = LoadGenerator(mock, catalogue, args.mix, args.timeout)
+            for concurrency in args.concurrency:
+                progress(f"Running for {args.seconds}s with {concurrency} virtual users.")
+                finished, timeouts, wall = await generator.run(concurrency, args.seconds)
+                results.extend(summarize_run(finished, timeouts, wall, concurrency))
+
+            results.append({
+                "benchmark": "mock.requests", "requests": dict(mock.requests), "unhandled": dict(mock.unhandled),
+                "max_loop_lag_us": bot.loop_monitor.max_lag * 1e6,
+            })
+            await bot.close()
+            await runner
+    finally:
+        await mock.stop()
+    return results
+
+
+async def main() -> None:
+    parser = make_parser("Load tests the bot against a local mock of discord.")
+    parser.add_argument("--emojis", type=int, default=2000, help="Emojis the bot starts with.")
+    parser.add_argument("--users", type=int, default=10000, help="Users that send interactions.")
+    parser.add_argument("--concurrency", type=int_list, default=[16, 64, 256], help="Virtual users.")
+    parser.add_argument("--seconds", type=float, default=20, help="Duration of each concurrency run.")
+    parser.add_argument("--timeout", type=float, default=10, help="Seconds before an interaction is a timeout.")
+    parser.add_argument("--startup-timeout", type=float, default=60, help="Seconds to wait for the bot to start.")
+    parser.add_argument("--port", type=int, default=0, help="Port of the mock server, random when 0.")
+    parser.add_argument(
+        "--mix", type=parse_mix, default=DEFAULT_MIX, help="Weighted interactions, such as e=60,text_autocomplete=35."
+    )
+    parser.add_argument("--verbose", action="store_true", help="Show the bot's logs.")
+    args = parser.parse_args()
+
+    discord.utils.setup_logging(level=logging.INFO if args.verbose else logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        results = await run_bot(args, directory)
+    emit("load", args, results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
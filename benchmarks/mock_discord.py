@@ -0,0 +1,336 @@
+"""Local stand-in for the parts of the discord API, gateway and CDN that the bot talks to."""
+from __future__ import annotations
+
+import asyncio
+import base64
+import collections
+import io
+import itertools
+import json
+import random
+import time
+import typing
+
+import discord
+from aiohttp import web
+
+APPLICATION_ID = 1297004204350636112
+OWNER_ID = 1
+CHANNEL_BASE = 5 * 10 ** 17
+DEFERRED_CALLBACKS = (5, 6)  # responses that promise a message later.
+
+
+def user_payload(user_id: int, *, bot: bool = False) -> dict[str, typing.Any]:
+    return {
+        "id": str(user_id), "username": f"user{user_id}", "global_name": None, "discriminator": "0",
+        "avatar": None, "bot": bot, "public_flags": 0,
+    }
+
+
+def emoji_payload(emoji_id: int, name: str, *, animated: bool = False) -> dict[str, typing.Any]:
+    return {
+        "id": str(emoji_id), "name": name, "animated": animated, "roles": [], "require_colons": True,
+        "managed": False, "available": True, "user": user_payload(APPLICATION_ID, bot=True),
+    }
+
+
+def json_response(data: typing.Any, *, status: int = 200) -> web.Response:
+    """discord.py only parses bodies whose content type is exactly application/json, without a charset."""
+    return web.Response(body=json.dumps(data).encode(), status=status, content_type="application/json")
+
+
+def generated_image(emoji_id: int) -> bytes:
+    from benchmarks.corpus import base_image  # PIL is only needed once an image is downloaded.
+    buffer = io.BytesIO()
+    base_image(random.Random(emoji_id)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class InteractionTiming:
+    """Times a single interaction from its dispatch to the first response and to the message that completes it."""
+    __slots__ = ('kind', 'sent', 'acked', 'completed', 'done')
+
+    def __init__(self, kind: str) -> None:
+        self.kind: str = kind
+        self.sent: float = time.perf_counter()
+        self.acked: float | None = None
+        self.completed: float | None = None
+        self.done: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+
+    def ack(self) -> None:
+        if self.acked is None:
+            self.acked = time.perf_counter()
+
+    def complete(self) -> None:
+        self.ack()
+        if self.completed is None:
+            self.completed = time.perf_counter()
+            self.done.set_result(None)
+
+
+class MockDiscord:
+    """Serves REST routes under /api/v10, emoji images under /cdn and a gateway websocket under /gateway.
+
+    Emojis created through the API are kept in memory and their uploaded image is served back by the CDN.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.host: str = host
+        self.port: int = port
+        self.emojis: dict[int, dict[str, typing.Any]] = {}
+        self.images: dict[int, bytes] = {}
+        self.commands: list[dict[str, typing.Any]] = []
+        self.timings: dict[str, InteractionTiming] = {}
+        self.requests: collections.Counter[str] = collections.Counter()
+        self.unhandled: collections.Counter[str] = collections.Counter()
+        self.emoji_map: dict[str, str] = {"smile": "\U0001f604", "wave": "\U0001f44b", "thumbsup": "\U0001f44d"}
+        self.gateway_socket: web.WebSocketResponse | None = None
+        self.gateway_ready: asyncio.Event = asyncio.Event()
+        self.runner: web.AppRunner | None = None
+        self._sequence = itertools.count(1)
+        self._snowflakes = itertools.count()
+        self._heartbeat_interval: int = 41250
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def snowflake(self) -> int:
+        return discord.utils.time_snowflake(discord.utils.utcnow()) + next(self._snowflakes) % 4096
+
+    def add_emoji(self, emoji_id: int, name: str, *, animated: bool = False) -> dict[str, typing.Any]:
+        self.emojis[emoji_id] = payload = emoji_payload(emoji_id, name, animated=animated)
+        return payload
+
+    def patch_client(self) -> None:
+        """Point discord.py and the bot to this server instead of discord."""
+        import yarl
+        from discord.gateway import DiscordWebSocket
+        from discord.http import Route
+        from core.client import NormalDiscordEmoji
+
+        Route.BASE = f"{self.base_url}/api/v10"
+        discord.Asset.BASE = f"{self.base_url}/cdn"
+        DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(f"ws://{self.host}:{self.port}/gateway/")
+        NormalDiscordEmoji.URL = f"{self.base_url}/emoji_map.json"
+
+    def message_payload(self, channel_id: int, payload: dict[str, typing.Any] | None = None) -> dict[str, typing.Any]:
+        payload = payload or {}
+        return {
+            "id": str(self.snowflake()), "channel_id": str(channel_id), "type": 0,
+            "author": user_payload(APPLICATION_ID, bot=True), "content": payload.get("content") or "",
+            "timestamp": discord.utils.utcnow().isoformat(), "edited_timestamp": None, "tts": False,
+            "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+            "embeds": payload.get("embeds") or [], "components": payload.get("components") or [],
+            "pinned": False, "flags": payload.get("flags") or 0, "application_id": str(APPLICATION_ID),
+            "webhook_id": str(APPLICATION_ID),
+        }
+
+    # gateway
+
+    async def dispatch(self, event: str, data: dict[str, typing.Any]) -> None:
+        if self.gateway_socket is None:
+            raise RuntimeError("The bot is not connected to the gateway.")
+        await self.gateway_socket.send_str(json.dumps({"op": 0, "s": next(self._sequence), "t": event, "d": data}))
+
+    async def gateway(self, request: web.Request) -> web.WebSocketResponse:
+        socket = web.WebSocketResponse(max_msg_size=0)
+        await socket.prepare(request)
+        self.gateway_socket = socket
+        await socket.send_json({"op": 10, "d": {"heartbeat_interval": self._heartbeat_interval}})
+        async for message in socket:
+            payload = json.loads(message.data)
+            op = payload["op"]
+            if op == 1:
+                await socket.send_json({"op": 11})
+            elif op == 2:
+                await self.dispatch("READY", {
+                    "v": 10, "user": {**user_payload(APPLICATION_ID, bot=True), "verified": True, "flags": 0},
+                    "guilds": [], "private_channels": [], "relationships": [], "session_id": "mock",
+                    "resume_gateway_url": f"ws://{self.host}:{self.port}/gateway/",
+                    "application": {"id": str(APPLICATION_ID), "flags": 0},
+                })
+                self.gateway_ready.set()
+
+        self.gateway_socket = None
+        self.gateway_ready.clear()
+        return socket
+
+    # interactions
+
+    def timing_of(self, token: str) -> InteractionTiming | None:
+        return self.timings.get(token)
+
+    def callback_response(self, request: web.Request, body: dict[str, typing.Any]) -> web.Response:
+        interaction_id = request.match_info["interaction_id"]
+        if request.query.get("with_response") not in ("true", "True", "1"):
+            return web.Response(status=204)
+
+        resource: dict[str, typing.Any] = {"type": body["type"]}
+        if body["type"] in (4, 7):
+            resource["message"] = self.message_payload(CHANNEL_BASE, body.get("data"))
+        return json_response({"interaction": {"id": interaction_id, "type": 2}, "resource": resource})
+
+    async def interaction_callback(self, request: web.Request) -> web.Response:
+        body = await self.read_payload(request)
+        if (timing := self.timing_of(request.match_info["token"])) is not None:
+            if body.get("type") in DEFERRED_CALLBACKS:
+                timing.ack()
+            else:
+                timing.complete()
+        return self.callback_response(request, body)
+
+    async def webhook_message(self, request: web.Request) -> web.Response:
+        body = await self.read_payload(request)
+        if (timing := self.timing_of(request.match_info["token"])) is not None:
+            timing.complete()
+        return json_response(self.message_payload(CHANNEL_BASE, body))
+
+    async def webhook_delete(self, request: web.Request) -> web.Response:
+        return web.Response(status=204)
+
+    @staticmethod
+    async def read_payload(request: web.Request) -> dict[str, typing.Any]:
+        if request.content_type.startswith("multipart/"):
+            reader = await request.multipart()
+            async for part in reader:
+                if part.name == "payload_json":
+                    return json.loads(await part.text())
+            return {}
+
+        if not request.can_read_body:
+            return {}
+        return await request.json()
+
+    # rest
+
+    async def get_me(self, request: web.Request) -> web.Response:
+        return json_response({**user_payload(APPLICATION_ID, bot=True), "verified": True, "flags": 0})
+
+    async def get_application(self, request: web.Request) -> web.Response:
+        return json_response({
+            "id": str(APPLICATION_ID), "name": "stemoji", "icon": None, "description": "", "summary": "",
+            "bot_public": True, "bot_require_code_grant": False, "owner": user_payload(OWNER_ID), "team": None,
+            "verify_key": "0" * 64, "flags": 0, "tags": [], "rpc_origins": [], "redirect_uris": [],
+            "interactions_endpoint_url": None, "approximate_guild_count": 0,
+        })
+
+    async def get_user(self, request: web.Request) -> web.Response:
+        return json_response(user_payload(int(request.match_info["user_id"])))
+
+    async def list_emojis(self, request: web.Request) -> web.Response:
+        return json_response({"items": [*self.emojis.values()]})
+
+    async def create_emoji(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        emoji_id = self.snowflake()
+        header, _, encoded = body["image"].partition(",")
+        self.images[emoji_id] = base64.b64decode(encoded)
+        return json_response(self.add_emoji(emoji_id, body["name"], animated="image/gif" in header), status=201)
+
+    async def edit_emoji(self, request: web.Request) -> web.Response:
+        emoji = self.emojis.get(int(request.match_info["emoji_id"]))
+        if emoji is None:
+            return json_response({"message": "Unknown Emoji", "code": 10014}, status=404)
+
+        emoji["name"] = (await request.json()).get("name", emoji["name"])
+        return json_response(emoji)
+
+    async def delete_emoji(self, request: web.Request) -> web.Response:
+        emoji_id = int(request.match_info["emoji_id"])
+        self.emojis.pop(emoji_id, None)
+        self.images.pop(emoji_id, None)
+        return web.Response(status=204)
+
+    async def get_commands(self, request: web.Request) -> web.Response:
+        return json_response(self.commands)
+
+    async def put_commands(self, request: web.Request) -> web.Response:
+        self.commands = [
+            {
+                **command, "id": str(self.snowflake()), "application_id": str(APPLICATION_ID), "version": "1",
+                "default_member_permissions": command.get("default_member_permissions"),
+                "description": command.get("description", ""), "nsfw": command.get("nsfw", False),
+            }
+            for command in await request.json()
+        ]
+        return json_response(self.commands)
+
+    async def cdn_emoji(self, request: web.Request) -> web.Response:
+        emoji_id = int(request.match_info["filename"].partition(".")[0])
+        if (image := self.images.get(emoji_id)) is None:
+            image = self.images[emoji_id] = await asyncio.to_thread(generated_image, emoji_id)
+        return web.Response(body=image, content_type="image/png")
+
+    async def get_emoji_map(self, request: web.Request) -> web.Response:
+        return web.Response(text=json.dumps(self.emoji_map), content_type="text/plain")
+
+    @web.middleware
+    async def count_requests(self, request: web.Request, handler: typing.Callable) -> web.StreamResponse:
+        route = request.match_info.route.resource
+        name = route.canonical if route is not None else "unknown"
+        self.requests[f"{request.method} {name}"] += 1
+        return await handler(request)
+
+    async def not_found(self, request: web.Request) -> web.Response:
+        self.unhandled[f"{request.method} {request.path}"] += 1
+        return json_response({"message": "404: Not Found", "code": 0}, status=404)
+
+    def application(self) -> web.Application:
+        app = web.Application(middlewares=[self.count_requests], client_max_size=32 * 1024 ** 2)
+        api = "/api/v10"
+        app_path = f"{api}/applications/{{application_id}}"
+        webhook = f"{api}/webhooks/{{application_id}}/{{token}}"
+        app.router.add_get("/gateway/", self.gateway)
+        app.router.add_get("/emoji_map.json", self.get_emoji_map)
+        app.router.add_get("/cdn/emojis/{filename}", self.cdn_emoji)
+        app.router.add_get(f"{api}/users/@me", self.get_me)
+        app.router.add_get(f"{api}/users/{{user_id}}", self.get_user)
+        app.router.add_get(f"{api}/oauth2/applications/@me", self.get_application)
+        app.router.add_get(f"{app_path}/emojis", self.list_emojis)
+        app.router.add_post(f"{app_path}/emojis", self.create_emoji)
+        app.router.add_patch(f"{app_path}/emojis/{{emoji_id}}", self.edit_emoji)
+        app.router.add_delete(f"{app_path}/emojis/{{emoji_id}}", self.delete_emoji)
+        app.router.add_get(f"{app_path}/commands", self.get_commands)
+        app.router.add_put(f"{app_path}/commands", self.put_commands)
+        app.router.add_post(f"{api}/interactions/{{interaction_id}}/{{token}}/callback", self.interaction_callback)
+        app.router.add_post(webhook, self.webhook_message)
+        app.router.add_patch(f"{webhook}/messages/{{message_id}}", self.webhook_message)
+        app.router.add_delete(f"{webhook}/messages/{{message_id}}", self.webhook_delete)
+        app.router.add_route("*", "/{tail:.*}", self.not_found)
+        return app
+
+    async def start(self) -> None:
+        self.runner = web.AppRunner(self.application(), access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        if self.port == 0:
+            self.port = self.runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+
+def interaction_payload(
+        mock: MockDiscord, token: str, user_id: int, interaction_type: int, data: dict[str, typing.Any]
+) -> dict[str, typing.Any]:
+    """INTERACTION_CREATE from a user in their DM with the bot, as a user installed app."""
+    user = user_payload(user_id)
+    channel_id = CHANNEL_BASE + user_id
+    return {
+        "id": str(mock.snowflake()), "application_id": str(APPLICATION_ID), "type": interaction_type,
+        "data": data, "token": token, "version": 1, "user": user, "locale": "en-US", "app_permissions": "0",
+        "channel_id": str(channel_id), "channel": {"id": str(channel_id), "type": 1, "recipients": [user]},
+        "entitlements": [], "authorizing_integration_owners": {"1": str(user_id)}, "context": 1,
+        "attachment_size_limit": 10 * 1024 ** 2,
+    }
+
+
+def message_with_emoji(mock: MockDiscord, user_id: int, emoji_id: int, name: str) -> dict[str, typing.Any]:
+    return {
+        **mock.message_payload(CHANNEL_BASE + user_id, {"content": f"look at this <:{name}:{emoji_id}>"}),
+        "author": user_payload(user_id), "webhook_id": None, "application_id": None,
+    }
+
@@ -15,9 +15,11 @@ from core.models import PersonalEmoji, DownloadedEmoji
 from core.typings import EInteraction, EContext
 from core.ui_components import EmojiDownloadView, RenameEmojiModal, RenameEmojiButton, SendEmojiView, TextEmojiModal, \
     ContextViewAuthor, PaginationContextView, saving_emoji_interaction, SelectEmojiPagination, SaveButton
-from utils.general import inline_pages, slash_parse as _S, describe
-from utils.parsers import find_latest_unpaired_semicolon, VALID_EMOJI_SEMI, find_latest_unpaired_emoji, \
-    VALID_EMOJI_NORMAL, FuzzyInsensitive
+from utils.general import inline_pages, iter_sorted, slash_parse as _S, describe
+from utils.parsers import find_latest_unpaired_semicolon, find_latest_unpaired_emoji, FuzzyInsensitive
+
+OWNER_RESOLVE_LIMIT = 4  # fetch_user calls at once for a single /emoji view.
+DUPLICATE_LOOKAHEAD = 2  # emojis after the current page that are checked for duplicates ahead of time.
 
 
 @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
@@ -72,19 +74,42 @@ class Emoji(commands.GroupCog):
         emojis = [*ctx.bot.emojis_users.values()]
         async with ctx.typing(ephemeral=True):
             await ctx.bot.ensure_bulk_user_usage(author)
-            emojis.sort(key=lambda emote: emote.usages[author.id], reverse=True)
+            emojis.sort(key=lambda emote: emote.usage_of(author.id), reverse=True)
 
-        async for page in inline_pages(emojis, ctx, per_page=6, cls=PaginationContextView):
-            embed = page.embed
-            embed.title = "View of emojis"
-            embed.colour = ctx.bot.primary_color
-            for emoji in page.item.data:
-                embed.add_field(
-                    name=f"{emoji} {emoji.name}",
-                    value=f"**Used:** {emoji.usages[author.id]}\n"
-                          f"**Added By:**{await emoji.resolve_owner()}\n"
-                          f"**Created At:**{discord.utils.format_dt(emoji.created_at, 'd')}"
-                )
+        per_page = 6
+        limit = asyncio.Semaphore(OWNER_RESOLVE_LIMIT)
+        prefetches: set[asyncio.Task] = set()
+
+        async def prefetch(page_index: int) -> None:
+            try:
+                await PersonalEmoji.resolve_owners(emojis[page_index * per_page:(page_index + 1) * per_page], limit)
+            except discord.HTTPException:
+                pass  # the page shows the error when it is opened.
+
+        try:
+            async for page in inline_pages(emojis, ctx, per_page=per_page, cls=PaginationContextView):
+                embed = page.embed
+                embed.title = "View of emojis"
+                embed.colour = ctx.bot.primary_color
+                owners = await PersonalEmoji.resolve_owners(page.item.data, limit)
+                # owners of the pages around are fetched while this one is read, fetch_user is shared if they overlap.
+                current = page.view.current_page
+                for index in (current + 1, current - 1):
+                    if 0 <= index * per_page < len(emojis):
+                        task = asyncio.create_task(prefetch(index))
+                        prefetches.add(task)
+                        task.add_done_callback(prefetches.discard)
+
+                for emoji, owner in zip(page.item.data, owners):
+                    embed.add_field(
+                        name=f"{emoji} {emoji.name}",
+                        value=f"**Used:** {emoji.usage_of(author.id)}\n"
+                              f"**Added By:**{owner}\n"
+                              f"**Created At:**{discord.utils.format_dt(emoji.created_at, 'd')}"
+                    )
+        finally:
+            for task in prefetches:
+                task.cancel()
 
     @commands.hybrid_command(name="list")
     async def _list(self, ctx: EContext):
@@ -92,10 +117,11 @@ class Emoji(commands.GroupCog):
         async with ctx.typing(ephemeral=True):
             await ctx.bot.ensure_bulk_user_usage(ctx.author)
 
-        items = [emoji for emoji in ctx.bot.emojis_users.values()]
-        items.sort(key=lambda emoji: emoji.usages[ctx.author.id], reverse=True)
+        # only the pages that are viewed get ordered, the rest of the catalogue stays in the heap.
+        author_id = ctx.author.id
+        items = iter_sorted(ctx.bot.emojis_users.values(), key=lambda emoji: emoji.usage_of(author_id), reverse=True)
         async for page in inline_pages(items, ctx, per_page=12):
-            list_emojis = '\n'.join([f'{emoji}: {emoji.name} [`{emoji.usages[ctx.author.id]}`]'
+            list_emojis = '\n'.join([f'{emoji}: {emoji.name} [`{emoji.usage_of(ctx.author.id)}`]'
                                      for emoji in page.item.data])
             embed = page.embed
             embed.title = "List of emojis"
@@ -118,19 +144,7 @@ class Emoji(commands.GroupCog):
                 await interaction.response.send_modal(TextEmojiModal())
             return
 
-        def process_emoji(match):
-            if (emoji := ctx.bot.get_custom_emoji(match.group('emoji_name'))) is not None:
-                return f'{emoji:u}'
-            return match.group(0)
-
-        def process_norm_emoji(match):
-            if (emoji := ctx.bot.normal_emojis.get(match.group('emoji_name'))) is not None:
-                return emoji.unicode
-            return match.group(0)
-
-        text = VALID_EMOJI_SEMI.sub(process_emoji, text)
-        text = VALID_EMOJI_NORMAL.sub(process_norm_emoji, text)
-        await ctx.send(text)
+        await ctx.send(ctx.bot.render_emoji_text(text))
 
     @_text.autocomplete('text')
     async def find_nearest_emoji(self, interaction: EInteraction, current: str) -> list[Choice[str]]:
@@ -201,12 +215,12 @@ class Emoji(commands.GroupCog):
         """Briefly list all of your favourite emojis!"""
         author = ctx.author
         async with ctx.typing(ephemeral=True):
-            records = await ctx.bot.db.list_emoji_favourite(author.id)
-            p_emojis = [ctx.bot.emojis_users[record.emoji_id] for record in records]
-            await ctx.bot.ensure_bulk_user_usage(ctx.author)
-            p_emojis.sort(key=lambda emote: emote.usages[author.id], reverse=True)
+            await asyncio.gather(ctx.bot.ensure_bulk_favourite_user(author), ctx.bot.ensure_bulk_user_usage(author))
+            favourites = ctx.bot.user_states.get(author.id).favourites
+            p_emojis = [emoji for emoji_id in favourites if (emoji := ctx.bot.emojis_users.get(emoji_id))]
+            p_emojis.sort(key=lambda emote: emote.usage_of(author.id), reverse=True)
 
-        if not records:
+        if not p_emojis:
             raise UserInputError(_S("No favourite emoji found! Do /emoji favourite add: to add a new emoji."))
 
         size_list = len(p_emojis)
@@ -215,7 +229,7 @@ class Emoji(commands.GroupCog):
             data = page.item.data
             offset = page.view.current_page * PER_PAGE
             list_emojis = "\n".join([
-                f'{i}. {emote} {emote.name}[{emote.usages[author.id]}]'
+                f'{i}. {emote} {emote.name}[{emote.usage_of(author.id)}]'
                 for i, emote in enumerate(data, start=offset)
             ])
             embed = page.embed
@@ -336,27 +350,48 @@ async def replying_emoji(interaction: EInteraction, message: discord.Message):
 
 
 async def emoji_paginations(emojis: list[PersonalEmoji], context: EContext):
-    emoji_dups = {emoji.id: asyncio.create_task(context.bot.find_image_duplicates(emoji)) for emoji in emojis}
-    async for page in inline_pages(emojis, context, cls=EmojiDownloadView, per_page=1):
-        item = page.item
-        emoji, = item.data
-        view = page.view
-        save_button = view.save_button
-        save_button.target_emoji = emoji
-        file = await emoji.to_file(filename=f"{emoji.name}_emoji.png")
-        dups = await emoji_dups[emoji.id]
-        embed = page.embed
-        embed.title = emoji.name
-        embed.set_image(url=f"attachment://{file.filename}")
-        if dups:
-            found_dups = '\n'.join([f'- {emote} ({emote.name})' for emote, _score in dups])
-            embed.description = f"Possible duplicates:\n{found_dups}"
+    bot = context.bot
+    emoji_dups: dict[int, asyncio.Task] = {}
 
-        save_button.disabled = emoji.id in view.save_button.emoji_downloaded
-        if page.iteration == 0:
-            item.format(embed=embed, file=file)
-        else:
-            item.format(embed=embed, attachments=[file])
+    async def find_duplicates(emoji: PersonalEmoji) -> list[tuple[PersonalEmoji, int]]:
+        async with bot.duplicate_check_limit:
+            return await bot.find_image_duplicates(emoji)
+
+    def check_duplicates(emoji: PersonalEmoji) -> asyncio.Task:
+        if (task := emoji_dups.get(emoji.id)) is None:
+            task = emoji_dups[emoji.id] = asyncio.create_task(find_duplicates(emoji))
+        return task
+
+    try:
+        async for page in inline_pages(emojis, context, cls=EmojiDownloadView, per_page=1):
+            item = page.item
+            emoji, = item.data
+            view = page.view
+            dups_task = check_duplicates(emoji)
+            # only the emojis that are about to be seen are downloaded and hashed.
+            upcoming = view.current_page + 1
+            for emote in emojis[upcoming:upcoming + DUPLICATE_LOOKAHEAD]:
+                check_duplicates(emote)
+
+            save_button = view.save_button
+            save_button.target_emoji = emoji
+            file = await emoji.to_file(filename=f"{emoji.name}_emoji.png")
+            dups = await dups_task
+            embed = page.embed
+            embed.title = emoji.name
+            embed.set_image(url=f"attachment://{file.filename}")
+            if dups:
+                found_dups = '\n'.join([f'- {emote} ({emote.name})' for emote, _score in dups])
+                embed.description = f"Possible duplicates:\n{found_dups}"
+
+            save_button.disabled = emoji.id in view.save_button.emoji_downloaded
+            if page.iteration == 0:
+                item.format(embed=embed, file=file)
+            else:
+                item.format(embed=embed, attachments=[file])
+    finally:
+        for task in emoji_dups.values():
+            task.cancel()
 
 
 @app_commands.context_menu(name="Steal Emoji Server")
@@ -6,6 +6,7 @@ import discord
 from discord import ClientUser
 from discord.ext import commands
 
+from core.errors import MutationPending
 from core.typings import StellaEmojiBot
 from utils.general import LOGGER_NAME
 from utils.parsers import env
@@ -35,6 +36,8 @@ class FileLock:
 
 
 class MirrorCog(commands.Cog):
+    RETAIN_TIMEOUT = 30  # seconds shutdown waits for the original profile to be restored.
+
     def __init__(self, bot: StellaEmojiBot):
         self.bot = bot
         self.bot_suffixes = env("BOT_NAME_SUFFIX")
@@ -47,6 +50,15 @@ class MirrorCog(commands.Cog):
         self.is_retainable = None
         self.log = logging.getLogger(f"{LOGGER_NAME}.mirror")
 
+    async def edit_profile(self, *, timeout: float | None = None, **fields) -> ClientUser:
+        """Edits queued one after another, fields of edits that haven't run yet are merged into one."""
+        mutations = self.bot.mutations
+        job = mutations.submit('profile', 'profile', self._edit_profile, key='profile', **fields)
+        return await mutations.wait(job, timeout)
+
+    async def _edit_profile(self, **fields) -> ClientUser:
+        return await self.bot.user.edit(**fields)
+
     async def save_original_image(self):
         self.is_avatar_default = self.bot.user.avatar is None
         if self.is_avatar_default:
@@ -63,7 +75,13 @@ class MirrorCog(commands.Cog):
                 image_bytes = r.read()
         else:
             image_bytes = None
-        await self.bot.user.edit(username=self.original_client_username, avatar=image_bytes)
+        try:
+            await self.edit_profile(
+                timeout=self.RETAIN_TIMEOUT, username=self.original_client_username, avatar=image_bytes
+            )
+        except MutationPending:
+            self.log.warning("Discord did not accept the original profile in time, it was not restored.")
+            return
         self.log.info("DONE :)")
 
     async def save_original_profile(self):
@@ -87,7 +105,7 @@ class MirrorCog(commands.Cog):
         info = await bot.application_info()
         owner = info.owner
 
-        await bot.user.edit(avatar=await owner.avatar.read(), username=f"{owner.global_name}{self.bot_suffixes}")
+        await self.edit_profile(avatar=await owner.avatar.read(), username=f"{owner.global_name}{self.bot_suffixes}")
 
     async def cog_load(self) -> None:
         self.log.info("Profile syncing is enabled. This will override your bot's name and avatar in 90 seconds!")
@@ -109,9 +127,9 @@ class MirrorCog(commands.Cog):
         self.log.info(f"DETECTING OWNER UPDATE FOR {after}")
         if before.display_avatar != after.display_avatar:
             self.log.info(f"DETECTING USER CHANGE {before.display_avatar} -> {after.display_avatar}")
-            self.client_user = await bot.user.edit(avatar=await after.display_avatar.read())
+            self.client_user = await self.edit_profile(avatar=await after.display_avatar.read())
         elif before.display_name != after.display_name:
-            self.client_user = await bot.user.edit(username=f"{after.display_name}{self.bot_suffixes}")
+            self.client_user = await self.edit_profile(username=f"{after.display_name}{self.bot_suffixes}")
             self.log.info(f"DETECTING USER DISPLAY {before.display_name} -> {after.display_name}")
 
 
@@ -1,6 +1,5 @@
 import asyncio
 import traceback
-from collections import defaultdict, deque
 
 import discord
 import starlight
@@ -15,7 +14,6 @@ from utils.general import slash_parse as _S
 
 class ReactionCog(commands.Cog):
     def __init__(self, bot: StellaEmojiBot):
-        self.past_sent: dict[int, deque] = defaultdict(lambda: deque(maxlen=10))
         self.bot: StellaEmojiBot = bot
         self.context_react_message: app_commands.ContextMenu | None = None
 
@@ -29,12 +27,13 @@ class ReactionCog(commands.Cog):
 
     @commands.Cog.listener()
     async def on_implicit_sent_emoji(self, user: discord.User, emoji: PersonalEmoji) -> None:
-        self.past_sent[user.id].append(emoji)
+        self.bot.user_states.get(user.id).sent(emoji)
 
     @app_commands.allowed_contexts(guilds=True, dms=True)
     @app_commands.allowed_installs(guilds=True, users=True)
     async def react_message_emoji(self, interaction: EInteraction, message: discord.Message):
-        used_emojis = {emoji.id: emoji for emoji in reversed(self.past_sent[interaction.user.id])}
+        past_sent = self.bot.user_states.get(interaction.user.id).past_sent or ()
+        used_emojis = {emoji.id: emoji for emoji in reversed(past_sent)}
         buttons = [discord.ui.Button(emoji=emote.emoji, label=emote.name) for emote in used_emojis.values()]
         emoji_to_react = None
         if buttons:
@@ -0,0 +1,224 @@
+"""Zip archives of the whole emoji catalogue, used to move every emoji into another application.
+
+    metadata.json               format version, bot version and when it was exported.
+    emojis.jsonl                one emoji per line with its name, owner, hash, favourites and usages.
+    images/<id>.<png|gif>       the image of every emoji, stored as is.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import datetime
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import typing
+import zipfile
+
+import discord
+
+from core.client import EmojiBulkImporter, VERSION
+from core.errors import UserInputError
+from core.models import PersonalEmoji
+from utils.general import LOGGER_NAME
+
+if typing.TYPE_CHECKING:
+    import imagehash
+
+    from core.client import StellaEmojiBot
+
+FORMAT_VERSION = 1
+METADATA = "metadata.json"
+MANIFEST = "emojis.jsonl"
+
+
+class ArchiveEntry:
+    """An emoji inside an archive, its image is only read from the archive once it's about to be saved."""
+    __slots__ = ('archive', 'image', 'name', 'added_by', 'hash_hex', 'usages', 'favourites')
+
+    def __init__(self, archive: zipfile.ZipFile, row: dict[str, typing.Any]) -> None:
+        self.archive: zipfile.ZipFile = archive
+        self.image: str = row["image"]
+        self.name: str = row["name"]
+        self.added_by: discord.Object = discord.Object(row["added_by"])
+        self.hash_hex: str | None = row.get("hash") or None
+        self.usages: dict[int, int] = {int(user_id): amount for user_id, amount in row.get("usages", {}).items()}
+        self.favourites: list[int] = row.get("favourites", [])
+
+    async def read(self) -> bytes:
+        return await asyncio.to_thread(self.archive.read, self.image)
+
+
+class EmojiArchiveExporter:
+    """Writes every emoji into a zip archive a batch at a time, no more than a batch of images is held in memory."""
+    BATCH_SIZE = 50
+
+    def __init__(self, bot: StellaEmojiBot, *, concurrency: int = 4) -> None:
+        self.bot: StellaEmojiBot = bot
+        self.semaphore: asyncio.Semaphore = asyncio.Semaphore(max(concurrency, 1))
+        self.exported: int = 0
+        self.failed: list[tuple[PersonalEmoji, Exception]] = []
+        self.log = logging.getLogger(f"{LOGGER_NAME}.archive")
+
+    async def download(self, emoji: PersonalEmoji) -> bytes:
+        async with self.semaphore:
+            return await emoji.read()
+
+    async def write_batch(
+            self, archive: zipfile.ZipFile, manifest: typing.IO[bytes], emojis: list[PersonalEmoji]
+    ) -> None:
+        emoji_ids = [emoji.id for emoji in emojis]
+        usages: dict[int, dict[int, int]] = collections.defaultdict(dict)
+        for usage in await self.bot.db.bulk_fetch_emoji_usages(emoji_ids):
+            usages[usage.emoji_id][usage.user_id] = usage.amount
+
+        favourites: dict[int, list[int]] = collections.defaultdict(list)
+        for favourite in await self.bot.db.bulk_list_emoji_favourite_of(emoji_ids):
+            favourites[favourite.emoji_id].append(favourite.user_id)
+
+        downloads = [asyncio.create_task(self.download(emoji)) for emoji in emojis]
+        try:
+            for emoji, download in zip(emojis, downloads):
+                try:
+                    image = await download
+                except discord.HTTPException as e:
+                    self.log.warning(f"Unable to download {emoji.name}({emoji.id}): {e}")
+                    self.failed.append((emoji, e))
+                    continue
+
+                path = f"images/{emoji.id}.{'gif' if emoji.animated else 'png'}"
+                await asyncio.to_thread(archive.writestr, path, image, compress_type=zipfile.ZIP_STORED)
+                added_by = emoji.added_by.id if emoji.added_by is not None else self.bot.user.id
+                row = {
+                    "id": emoji.id, "name": emoji.name, "animated": emoji.animated, "image": path,
+                    "added_by": added_by, "hash": emoji.hash_hex or "", "favourites": favourites[emoji.id],
+                    "usages": {str(user_id): amount for user_id, amount in usages[emoji.id].items()},
+                }
+                manifest.write(json.dumps(row, separators=(',', ':')).encode() + b"\n")
+                self.exported += 1
+        finally:
+            for download in downloads:
+                download.cancel()
+
+    def write_manifest(self, archive: zipfile.ZipFile, manifest: typing.IO[bytes]) -> None:
+        manifest.seek(0)
+        with archive.open(MANIFEST, 'w') as file:
+            shutil.copyfileobj(manifest, file)
+
+        metadata = {
+            "version": FORMAT_VERSION, "bot_version": VERSION, "emojis": self.exported,
+            "exported_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+        archive.writestr(METADATA, json.dumps(metadata))
+
+    async def export(self, path: str) -> EmojiArchiveExporter:
+        """Writes the archive into path, which is only replaced once the archive is complete."""
+        await self.bot.wait_until_emoji_synced()
+        emojis = [*self.bot.emojis_users.values()]
+        total = len(emojis)
+        temp_path = f"{path}.tmp"
+        self.log.info(f"Exporting {total} emoji(s) into {path}.")
+        try:
+            # images are compressed already, only the manifest is worth deflating.
+            with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as archive, tempfile.TemporaryFile() as manifest:
+                for start in range(0, total, self.BATCH_SIZE):
+                    await self.write_batch(archive, manifest, emojis[start:start + self.BATCH_SIZE])
+                    self.log.info(f"Exported {min(start + self.BATCH_SIZE, total)}/{total} emoji(s).")
+
+                await asyncio.to_thread(self.write_manifest, archive, manifest)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp_path)
+            raise
+
+        os.replace(temp_path, path)
+        return self
+
+
+class EmojiArchiveImporter(EmojiBulkImporter):
+    """Saves the emojis of an archive, skipping duplicates, then restores their favourites and usages.
+
+    Emojis are read from the archive as they're needed, never more than WINDOW of them ahead of being saved.
+    """
+    WINDOW = 16
+    BATCH_SIZE = 500
+
+    def __init__(self, bot: StellaEmojiBot, user: discord.abc.Snowflake) -> None:
+        super().__init__(bot, user)
+        self.expected: int | None = None
+        self.usages: list[tuple[int, int, int]] = []
+        self.favourites: list[tuple[int, int]] = []
+
+    def owner(self, emoji: ArchiveEntry) -> discord.abc.Snowflake:
+        return emoji.added_by
+
+    async def prepare(self, emoji: ArchiveEntry) -> tuple[bytes, imagehash.ImageHash]:
+        if emoji.hash_hex is None:
+            return await super().prepare(emoji)
+
+        import imagehash
+        async with self.bot.duplicate_check_limit:
+            return await emoji.read(), imagehash.hex_to_hash(emoji.hash_hex)
+
+    async def save(self, emoji: ArchiveEntry, image: bytes, img_hash: imagehash.ImageHash) -> PersonalEmoji | None:
+        saved = await super().save(emoji, image, img_hash)
+        if saved is not None:
+            emoji_id = saved.id
+            self.usages.extend((emoji_id, user_id, amount) for user_id, amount in emoji.usages.items())
+            self.favourites.extend((emoji_id, user_id) for user_id in emoji.favourites)
+
+        # entries are kept for the summary, their stats aren't needed after this.
+        emoji.usages, emoji.favourites = {}, []
+        if len(self.usages) + len(self.favourites) >= self.BATCH_SIZE:
+            await self.flush()
+        return saved
+
+    async def flush(self) -> None:
+        usages, favourites = self.usages, self.favourites
+        self.usages, self.favourites = [], []
+        user_ids = {user_id for _, user_id, _ in usages} | {user_id for _, user_id in favourites}
+        if user_ids:
+            await self.bot.db.bulk_create_users([*user_ids])
+        if usages:
+            await self.bot.db.bulk_upsert_emoji_usage(usages)
+        if favourites:
+            await self.bot.db.bulk_create_emoji_favourite(favourites)
+
+        for emoji_id, user_id, amount in usages:
+            if (emoji := self.bot.emojis_users.get(emoji_id)) is not None:
+                emoji.set_usage(user_id, amount)
+        for emoji_id, user_id in favourites:
+            if (emoji := self.bot.emojis_users.get(emoji_id)) is not None:
+                emoji.set_favourite(user_id)
+
+    async def import_archive(
+            self, path: str, on_progress: typing.Callable[[EmojiBulkImporter], typing.Awaitable[None]] | None = None
+    ) -> EmojiArchiveImporter:
+        await self.bot.wait_until_emoji_synced()  # duplicates are checked against the whole catalogue.
+        try:
+            archive = zipfile.ZipFile(path)
+        except (zipfile.BadZipFile, FileNotFoundError):
+            raise UserInputError(f"{os.path.basename(path)} is not an emoji archive.") from None
+
+        with archive:
+            try:
+                metadata = json.loads(archive.read(METADATA))
+            except KeyError:
+                raise UserInputError(f"{os.path.basename(path)} is not an emoji archive.") from None
+
+            if metadata.get("version") != FORMAT_VERSION:
+                raise UserInputError(f"Archive format {metadata.get('version')} is not supported.")
+
+            self.expected = metadata.get("emojis")
+            with archive.open(MANIFEST) as manifest:
+                lines = io.TextIOWrapper(manifest, encoding='utf-8')
+                entries = (ArchiveEntry(archive, json.loads(line)) for line in lines if line.strip())
+                try:
+                    await self.run(entries, on_progress, window=self.WINDOW)
+                finally:
+                    await self.flush()
+        return self
@@ -2,9 +2,14 @@ from __future__ import annotations
 import asyncio
 import datetime
 import functools
+import hashlib
+import itertools
 import json
 import logging
+import os
 import re
+import time
+import typing
 from typing import Any
 
 import aiohttp
@@ -14,13 +19,25 @@ from discord import app_commands
 from discord.ext import commands
 
 from core.db import DbPostgres, DbSqlite
-from core.errors import EmojiImageDuplicates
+from core.errors import EmojiImageDuplicates, UserInputError
+from core.loop_monitor import LoopLagMonitor
+from core.metrics import MetricsServer, COMMAND_LATENCY, AUTOCOMPLETE_LATENCY, CACHE_REQUESTS
 from core.models import PersonalEmoji, NormalEmoji
+from core.profiling import Profiler
+from core.scheduler import MutationScheduler
 from core.typings import EContext
+from core.user_state import UserStateCache
+from utils.cache import LRUCache, SingleFlight
 from utils.general import emoji_context, slash_context, LOGGER_NAME
-from utils.parsers import env
+from utils.importtime import import_timer
+from utils.parsers import env, VALID_EMOJI_SEMI, VALID_EMOJI_NORMAL
+
+if typing.TYPE_CHECKING:
+    import imagehash
 
 VERSION = "0.0.7"
+DUPLICATE_THRESHOLD = 9  # phash distance under this is treated as the same image.
+EMOJI_SYNC_TIMEOUT = 15.0
 
 
 class StellaEmojiBot(commands.Bot):
@@ -59,62 +76,119 @@ class StellaEmojiBot(commands.Bot):
         self.emojis_users: dict[int, PersonalEmoji] = {}
         self.emoji_names: dict[str, int] = {}
         self.emoji_filled: asyncio.Event = asyncio.Event()
+        self.emoji_synced: asyncio.Event = asyncio.Event()
+        self.snapshot: EmojiSnapshot = EmojiSnapshot(env("EMOJI_SNAPSHOT_PATH", default="emoji_snapshot.json"))
         self.primary_color: int = 0xffcccb
         self.normal_emojis: NormalDiscordEmoji = NormalDiscordEmoji(self)
         conn_string = env("DATABASE_DSN")
+        slow_query = env("DB_SLOW_QUERY_MS", int, default=200) / 1000
         if env('DATABASE') == 'postgres':
-            self.db: DbPostgres = DbPostgres(conn_string)
+            self.db: DbPostgres = DbPostgres(conn_string, slow_query_threshold=slow_query)
         elif env("DATABASE") == 'sqlite':
-            self.db: DbSqlite = DbSqlite(conn_string)
+            self.db: DbSqlite = DbSqlite(conn_string, slow_query_threshold=slow_query)
         else:
             raise RuntimeError("DATABASE environment variable has an invalid choice.")
 
         self.check_once(self.called_everywhere)
-        self.__get_user_lock: asyncio.Lock = asyncio.Lock()
-        self._fetched_user_usage: set[int] = set()
-        self._fetched_fav_usage: set[int] = set()
+        self.user_cache: LRUCache[int, discord.User] = LRUCache(
+            maxsize=env("USER_CACHE_SIZE", int, default=5000), ttl=env("USER_CACHE_TTL", int, default=3600)
+        )
+        self._user_fetches: SingleFlight[int, discord.User] = SingleFlight()
+        self.user_states: UserStateCache = UserStateCache(
+            max_users=env("USER_STATE_MAX_USERS", int, default=10000), ttl=env("USER_STATE_TTL", int, default=3600)
+        )
+        self._usage_loads: SingleFlight[int, None] = SingleFlight()
+        self._favourite_loads: SingleFlight[int, None] = SingleFlight()
         self._extension_loaded: asyncio.Event = asyncio.Event()
         self.log = log
         self.session: aiohttp.ClientSession | None = None
+        self.profiler: Profiler = Profiler()
+        lag_threshold = env("LOOP_LAG_THRESHOLD_MS", int, default=250) / 1000
+        self.loop_monitor: LoopLagMonitor = LoopLagMonitor(threshold=lag_threshold)
+        self.profiler.add_source('db', self.db.report_lines)
+        self.profiler.add_source('cache', self.cache_report_lines)
+        self.metrics_server: MetricsServer | None = None
+        if (metrics_port := env("METRICS_PORT", int, default=None)) is not None:
+            self.metrics_server = MetricsServer(self, env("METRICS_HOST", default="127.0.0.1"), metrics_port)
+        self.rehasher: EmojiRehasher = EmojiRehasher(self, concurrency=env("REHASH_CONCURRENCY", int, default=4))
+        self.duplicate_check_limit: asyncio.Semaphore = asyncio.Semaphore(
+            env("DUPLICATE_CHECK_CONCURRENCY", int, default=4)
+        )
+        self.mutations: MutationScheduler = MutationScheduler()
 
     def passive_bulk_user_usage(self, user: discord.User | discord.Member | discord.Object) -> asyncio.Task | None:
-        if user.id in self._fetched_user_usage:
+        if self.user_states.fresh(self.user_states.get(user.id).usage_loaded):
+            CACHE_REQUESTS.inc(cache="user_usage", result="hit")
             return
 
-        self._fetched_user_usage.add(user.id)
         return asyncio.create_task(self.ensure_bulk_user_usage(user))
 
     def passive_bulk_favourite_user(self, user: discord.User | discord.Member | discord.Object) -> asyncio.Task | None:
-        if user.id in self._fetched_fav_usage:
+        if self.user_states.fresh(self.user_states.get(user.id).favourite_loaded):
+            CACHE_REQUESTS.inc(cache="user_favourite", result="hit")
             return
 
-        self._fetched_fav_usage.add(user.id)
         return asyncio.create_task(self.ensure_bulk_favourite_user(user))
 
     async def ensure_bulk_favourite_user(self, user: discord.User | discord.Member | discord.Object) -> None:
-        user_id = user.id
-        records = await self.db.list_emoji_favourite(user_id)
-        for record in records:
-            if emoji := self.emojis_users.get(record.emoji_id):
-                emoji.favourites.add(user_id)
+        """Loads the user's favourites unless they were loaded recently, concurrent calls share one query."""
+        if self.user_states.fresh(self.user_states.get(user.id).favourite_loaded):
+            CACHE_REQUESTS.inc(cache="user_favourite", result="hit")
+            return
+
+        CACHE_REQUESTS.inc(cache="user_favourite", result="miss")
+        await self._favourite_loads.run(user.id, self._load_user_favourites)
+
+    async def _load_user_favourites(self, user_id: int) -> None:
+        state = self.user_states.get(user_id)
+        state.favourite_changes = {}  # a favourite or unfavourite during the query must survive its result.
+        try:
+            records = await self.db.list_emoji_favourite(user_id)
+            state.load_favourites(record.emoji_id for record in records)
+        finally:
+            state.favourite_changes = None
+        state.favourite_loaded = time.monotonic()
 
     async def ensure_bulk_user_usage(self, user: discord.User | discord.Member | discord.Object) -> None:
-        usages = await self.db.fetch_user_usages(user.id)
-        for usage in usages:
-            if emoji := self.emojis_users.get(usage.emoji_id):
-                emoji.usages[user.id] = usage.amount
-
-    async def get_or_fetch_user(
-            self, user_id: int, *, __user_cached={}  # noqa
-    ):
-        """I need to get or fetch and auto cache."""
-
-        if (user := self.get_user(user_id)) is None:
-            async with self.__get_user_lock:
-                if (user := __user_cached.get(user_id)) is None:
-                    user = await self.fetch_user(user_id)
-                    __user_cached[user.id] = user
+        """Loads the user's usages unless they were loaded recently, concurrent calls share one query."""
+        if self.user_states.fresh(self.user_states.get(user.id).usage_loaded):
+            CACHE_REQUESTS.inc(cache="user_usage", result="hit")
+            return
 
+        CACHE_REQUESTS.inc(cache="user_usage", result="miss")
+        await self._usage_loads.run(user.id, self._load_user_usages)
+
+    async def _load_user_usages(self, user_id: int) -> None:
+        records = await self.db.fetch_user_usages(user_id)
+        state = self.user_states.get(user_id)
+        usages = state.usages
+        for record in records:
+            # usages only go up, a flush that finished during the query already wrote the newer amount.
+            if record.amount > usages.get(record.emoji_id, 0):
+                usages[record.emoji_id] = record.amount
+        state.usage_loaded = time.monotonic()
+
+    def cache_report_lines(self) -> list[str]:
+        user_cache = self.user_cache
+        return [
+            *self.user_states.report_lines(),
+            f"{'fetched users':<20} {len(user_cache):>8} / {user_cache.maxsize}",
+            f"{'fetched user hits':<20} {user_cache.hits:>8}",
+            f"{'fetched user misses':<20} {user_cache.misses:>8}",
+        ]
+
+    async def get_or_fetch_user(self, user_id: int) -> discord.User | discord.Member:
+        """Users that aren't in discord's cache are fetched once, concurrent calls for the same id share it."""
+        if (user := self.get_user(user_id) or self.user_cache.get(user_id)) is not None:
+            CACHE_REQUESTS.inc(cache="user", result="hit")
+            return user
+
+        CACHE_REQUESTS.inc(cache="user", result="miss")
+        return await self._user_fetches.run(user_id, self._fetch_user_into_cache)
+
+    async def _fetch_user_into_cache(self, user_id: int) -> discord.User:
+        user = await self.fetch_user(user_id)
+        self.user_cache.set(user_id, user)
         return user
 
     async def called_everywhere(self, ctx: EContext): # noqa
@@ -122,28 +196,90 @@ class StellaEmojiBot(commands.Bot):
         slash_context.set(ctx)
         return not self.is_owner_only or await self.is_owner(ctx.author)
 
-    async def ensure_user(
-            self, user: discord.User | discord.Member | discord.Object, __user_inserted=set()  # noqa, we're keeping state.
-    ) -> None:
-        if user.id not in __user_inserted:
+    async def wait_until_emoji_synced(self, timeout: float = EMOJI_SYNC_TIMEOUT) -> None:
+        """Waits for the live emojis to replace the snapshot, which never happens when fetching them failed."""
+        try:
+            await asyncio.wait_for(self.emoji_synced.wait(), timeout)
+        except asyncio.TimeoutError:
+            raise UserInputError("Emojis are still being loaded from discord, try again later.") from None
+
+    async def ensure_user(self, user: discord.User | discord.Member | discord.Object) -> None:
+        state = self.user_states.get(user.id)
+        if not state.ensured:
             await self.db.create_user(user.id)
-            __user_inserted.add(user.id)
+            state.ensured = True
+
+    async def load_snapshot(self) -> None:
+        try:
+            rows = await self.snapshot.load()
+        except Exception as e:
+            self.log.warning(f"Unable to load emoji snapshot: {e}")
+            return
+
+        if not rows:
+            return
+
+        emojis_users = {}
+        for emoji_id, name, animated, img_hash, added_by in rows:
+            partial = discord.PartialEmoji.with_state(self._connection, animated=animated, name=name, id=emoji_id)
+            emoji = PersonalEmoji(self, partial)
+            if img_hash:
+                emoji.generate_from_hash(img_hash)
+            emoji.added_by = discord.Object(added_by)
+            emojis_users[emoji_id] = emoji
+
+        self.emojis_users = emojis_users
+        self.emoji_names = {emoji.name: emoji.id for emoji in emojis_users.values()}
+        self.emoji_filled.set()
+        self.log.info(f"Loaded {len(emojis_users)} emoji(s) from snapshot.")
+
+    async def save_snapshot(self) -> None:
+        try:
+            await self.snapshot.save(self.emojis_users.values())
+        except Exception as e:
+            self.log.warning(f"Unable to save emoji snapshot: {e}")
 
     async def sync_emojis(self):
         try:
-            self.emojis_users = {emoji.id: PersonalEmoji(self, emoji) for emoji in await self.fetch_application_emojis()}
+            emojis_users = {}
+            for live_emoji in await self.fetch_application_emojis():
+                # keeps the state that was already loaded from the snapshot.
+                if (emoji := self.emojis_users.get(live_emoji.id)) is not None:
+                    emoji.emoji = live_emoji
+                else:
+                    emoji = PersonalEmoji(self, live_emoji)
+                emojis_users[live_emoji.id] = emoji
+
+            self.emojis_users = emojis_users
             self.emoji_names = {emoji.name: emoji.id for emoji in self.emojis_users.values()}
+            self.emoji_filled.set()
+            self.emoji_synced.set()
             await self.normal_emojis.fill()
-            await asyncio.gather(*[emoji.ensure() for emoji in self.emojis_users.values()])
             emojis_records = await self.db.fetch_emojis()
             to_delete = []
             to_update_names = []
-            for emoji in emojis_records:
-                emoji_id = emoji.id
-                if emoji_id not in self.emojis_users:
+            for record in emojis_records:
+                emoji_id = record.id
+                if (emoji := self.emojis_users.get(emoji_id)) is None:
                     to_delete.append(emoji_id)
-                elif emoji.fullname != (emoji_name := self.emojis_users[emoji_id].name):
-                    to_update_names.append([emoji_id, emoji_name])
+                    continue
+
+                emoji.hydrate(record)
+                if record.fullname != emoji.name:
+                    to_update_names.append([emoji_id, emoji.name])
+
+            missing = [emoji for emoji in self.emojis_users.values() if emoji.db_data is None]
+            if missing:
+                # rows are created without a hash, the rehasher fills them in the background.
+                await self.ensure_user(self.user)
+                records = await self.db.bulk_create_emojis([
+                    (emoji.id, emoji.name, self.user.id, '') for emoji in missing
+                ])
+                for record in records:
+                    self.emojis_users[record.id].hydrate(record)
+
+            self.rehasher.submit([emoji for emoji in self.emojis_users.values() if emoji.hash_hex is None])
+            await self.save_snapshot()
 
             if to_update_names:
                 await self.db.bulk_update_emoji_names(to_update_names)
@@ -163,7 +299,14 @@ class StellaEmojiBot(commands.Bot):
         await guild.chunk()
 
     async def setup_hook(self):
+        import_timer.report(self.log)
+        import_timer.uninstall()
+        self.loop_monitor.start()
+        self.mutations.start()
+        if self.metrics_server is not None:
+            await self.metrics_server.start()
         await self.db.init_database()
+        await self.load_snapshot()
         await self.bot_metadata()
         _ = asyncio.create_task(self.sync_emojis())
         _ = asyncio.create_task(self.is_owner(discord.Object(1)))
@@ -186,6 +329,23 @@ class StellaEmojiBot(commands.Bot):
 
         self._extension_loaded.set()
 
+    async def invoke(self, ctx: EContext, /) -> None:
+        if ctx.command is None:
+            return await super().invoke(ctx)
+
+        start = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            COMMAND_LATENCY.observe(time.perf_counter() - start, command=ctx.command.qualified_name, type="text")
+
+    async def close(self) -> None:
+        self.loop_monitor.stop()
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        await super().close()
+        await self.mutations.stop()  # after the cogs unloaded, mirroring restores the profile through it.
+
     async def append_metadata(self, key: str, data: Any) -> None:
         meta = await self.db.fetch_metadata(VERSION)
         new_meta = meta.data.copy()
@@ -201,29 +361,45 @@ class StellaEmojiBot(commands.Bot):
         counter = new_meta.get("start_counter") or 0
         new_meta["start_counter"] = counter + 1
 
-        async def t():
-            await self._extension_loaded.wait()
-            self.log.info(f"Syncing slash command to discord in 10 seconds.")
-            await asyncio.sleep(10)
-            slashs = await self.tree.sync()
-            self.log.info(f"Synced {len(slashs)} commands.")
         if new_meta.get("first_time") is None or new_meta.get("first_time") is True:
             self.log.info(f"Version change detected.")
-            _ = asyncio.create_task(t())
             new_meta["first_time"] = False
         else:
             info = datetime.datetime.now().astimezone().tzinfo
             self.log.info(f"Using {VERSION} since {meta.created_at.astimezone(info)}.")
             self.log.info(f"Bot start counter {new_meta['start_counter']}")
-            if meta.data.get("slash_commands") is None:
-                self.log.info(f"Unable to find slash metadata.")
-                _ = asyncio.create_task(t())
-            else:
-                self.tree.update_slash_lookup(meta.data["slash_commands"])
 
+        if meta.data.get("slash_commands") is None:
+            self.log.info(f"Unable to find slash metadata.")
+        else:
+            self.tree.update_slash_lookup(meta.data["slash_commands"])
+
+        _ = asyncio.create_task(self.sync_changed_commands())
         await self.db.update_metadata(meta.id, new_meta)
         self.log.debug(f"Bot metadata updated.")
 
+    async def sync_changed_commands(self) -> None:
+        """Only sync scopes where the serialized command tree differs from what was last synced."""
+        await self._extension_loaded.wait()
+        meta = await self.db.fetch_metadata(VERSION)
+        stored_hashes = meta.data.get("slash_hashes", {})
+        stored_commands = meta.data.get("slash_commands", {})
+        changed = []
+        for scope in self.tree.scopes():
+            key = Tree.scope_key(scope)
+            if key not in stored_commands or stored_hashes.get(key) != self.tree.command_hash(guild=scope):
+                changed.append(scope)
+
+        if not changed:
+            self.log.info(f"Slash commands are unchanged, skipping sync.")
+            return
+
+        self.log.info(f"Syncing {len(changed)} slash command scope(s) to discord in 10 seconds.")
+        await asyncio.sleep(10)
+        for scope in changed:
+            slashs = await self.tree.sync(guild=scope)
+            self.log.info(f"Synced {len(slashs)} commands for {Tree.scope_key(scope)} scope.")
+
     async def _starter(self, token: str):
         discord.utils.setup_logging()
         async with self, self.db, aiohttp.ClientSession() as self.session:
@@ -233,6 +409,15 @@ class StellaEmojiBot(commands.Bot):
             await self.normal_emojis.http.close()
 
     def starter(self, token: str):
+        if env("USE_UVLOOP", bool, default=False):
+            try:
+                import uvloop
+            except ImportError:
+                self.log.warning("USE_UVLOOP is set but uvloop is not installed, using the default event loop.")
+            else:
+                asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+                self.log.info("Running on uvloop.")
+
         asyncio.run(self._starter(token))
 
     def get_custom_emoji(self, hasher: int | str) -> PersonalEmoji | None:
@@ -242,45 +427,281 @@ class StellaEmojiBot(commands.Bot):
             emoji_id = self.emoji_names.get(hasher)
             return self.emojis_users.get(emoji_id)
 
-    async def find_image_duplicates(self, emoji: discord.Emoji | discord.PartialEmoji | bytes) -> list[tuple[PersonalEmoji, int]]:
+    def render_emoji_text(self, text: str) -> str:
+        """Replace ;name; with custom emojis and :name: with unicode emojis, counting each custom emoji as used."""
+        def custom_emoji(match: re.Match) -> str:
+            if (emoji := self.get_custom_emoji(match.group('emoji_name'))) is not None:
+                return f'{emoji:u}'
+            return match.group(0)
+
+        def normal_emoji(match: re.Match) -> str:
+            if (emoji := self.normal_emojis.get(match.group('emoji_name'))) is not None:
+                return emoji.unicode
+            return match.group(0)
+
+        text = VALID_EMOJI_SEMI.sub(custom_emoji, text)
+        return VALID_EMOJI_NORMAL.sub(normal_emoji, text)
+
+    async def find_image_duplicates(
+            self, emoji: discord.Emoji | discord.PartialEmoji | bytes, *, threshold: int = DUPLICATE_THRESHOLD
+    ) -> list[tuple[PersonalEmoji, int]]:
         find_hash = PersonalEmoji.to_byte_hash if isinstance(emoji, bytes) else PersonalEmoji.to_image_hash
-        hasher = await find_hash(emoji)
-        similarity_emoji = [(emoji, hasher - emoji.image_hash) for emoji in self.emojis_users.values()]
+        return self.find_hash_duplicates(await find_hash(emoji), threshold=threshold)
+
+    def find_hash_duplicates(
+            self, hasher: imagehash.ImageHash, *, threshold: int = DUPLICATE_THRESHOLD
+    ) -> list[tuple[PersonalEmoji, int]]:
+        similarity_emoji = [
+            (emoji, hasher - emoji.image_hash) for emoji in self.emojis_users.values() if emoji.hash_hex is not None
+        ]
         similarity_emoji.sort(key=lambda sim: sim[1])
-        return [e for e in similarity_emoji if e[1] < 9][:5]
+        return [e for e in similarity_emoji if e[1] < threshold][:5]
+
+    def available_emoji_name(self, emoji_name: str) -> str:
+        """Name with a number appended or incremented until no emoji uses it."""
+        pattern_number_end = re.compile(r'^(?P<name>.+?)(?P<number>\d*)$')
+        while self.get_custom_emoji(emoji_name) is not None:
+            emoji_num = pattern_number_end.match(emoji_name)
+            try:
+                increment_value = int(emoji_num.group('number')) + 1
+                emoji_name = f'{emoji_num.group("name")}{increment_value}'
+            except ValueError:
+                emoji_name = f'{emoji_name}1'
+        return emoji_name
 
     async def save_emoji(
             self, emoji: discord.PartialEmoji | discord.Emoji | PersonalEmoji, user: discord.Object, *,
-            duplicate_image=False, increment=True
+            duplicate_image=False, increment=True, image: bytes | None = None,
+            image_hash: imagehash.ImageHash | None = None, timeout: float | None = MutationScheduler.DEFAULT_TIMEOUT
     ) -> PersonalEmoji:
-        img_bytes = await emoji.read()
-        emoji_name = None
-        if increment:
-            emoji_name = emoji.name
-            while True:
-                personal_emoji = self.get_custom_emoji(emoji_name)
-                if personal_emoji is None:
-                    break
-
-                pattern_number_end = re.compile(r'^(?P<name>.+?)(?P<number>\d*)$')
-                emoji_num = pattern_number_end.match(emoji_name)
-                try:
-                    increment_value = int(emoji_num.group('number')) + 1
-                    emoji_name = f'{emoji_num.group("name")}{increment_value}'
-                except ValueError:
-                    emoji_name = f'{emoji_name}1'
+        """Creates the emoji as an application emoji. image and image_hash skip downloading or hashing again.
 
+        The emoji is still created when it takes longer than timeout, MutationPending is raised instead.
+        """
+        img_bytes = await emoji.read() if image is None else image
+        img_hash = await PersonalEmoji.to_byte_hash(img_bytes) if image_hash is None else image_hash
         if not duplicate_image:
-            value = await self.find_image_duplicates(emoji)
+            value = self.find_hash_duplicates(img_hash)
             if value:
                 raise EmojiImageDuplicates(emoji, value)
 
-        emoji = await self.create_application_emoji(name=emoji_name or emoji.name, image=img_bytes)
-        new_emoji = PersonalEmoji(self, emoji)
-        await new_emoji.ensure(user)
-        self.emojis_users[emoji.id] = new_emoji
-        self.emoji_names[new_emoji.name] = emoji.id
-        return new_emoji
+        async def create() -> PersonalEmoji:
+            # named when it runs, emojis created before it in the queue may have taken the name.
+            emoji_name = self.available_emoji_name(emoji.name) if increment else emoji.name
+            created = await self.create_application_emoji(name=emoji_name, image=img_bytes)
+            new_emoji = PersonalEmoji(self, created)
+            new_emoji.image_hash = img_hash
+            self.emojis_users[created.id] = new_emoji
+            self.emoji_names[new_emoji.name] = created.id
+            await new_emoji.ensure(user)
+            return new_emoji
+
+        return await self.mutations.wait(self.mutations.submit('emoji', 'create', create), timeout)
+
+    async def bulk_save_emojis(
+            self, emojis: typing.Iterable[typing.Any], user: discord.abc.Snowflake,
+            on_progress: typing.Callable[[EmojiBulkImporter], typing.Awaitable[None]] | None = None
+    ) -> EmojiBulkImporter:
+        """Saves every emoji, skipping those that are duplicates of an existing emoji."""
+        return await EmojiBulkImporter(self, user).run(emojis, on_progress)
+
+
+class EmojiRehasher:
+    """Downloads and hashes emojis that has no hash stored in the background."""
+    BATCH_SIZE = 50
+    MAX_RETRIES = 3
+
+    def __init__(self, bot: StellaEmojiBot, *, concurrency: int = 4) -> None:
+        self.bot: StellaEmojiBot = bot
+        self.concurrency: int = max(concurrency, 1)
+        self.semaphore: asyncio.Semaphore = asyncio.Semaphore(self.concurrency)
+        self.pending: set[int] = set()
+        self.tasks: set[asyncio.Task] = set()
+        self.log = logging.getLogger(f"{LOGGER_NAME}.rehash")
+
+    def submit(self, emojis: list[PersonalEmoji]) -> asyncio.Task | None:
+        emojis = [emoji for emoji in emojis if emoji.id not in self.pending]
+        if not emojis:
+            return
+
+        self.pending.update(emoji.id for emoji in emojis)
+        task = asyncio.create_task(self.run(emojis))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def hash_emoji(self, emoji: PersonalEmoji) -> tuple[int, str] | None:
+        async with self.semaphore:
+            for attempt in range(self.MAX_RETRIES):
+                try:
+                    img_hash = await emoji.create_image_hash()
+                except discord.HTTPException as e:
+                    if e.status != 429 or attempt + 1 == self.MAX_RETRIES:
+                        self.log.warning(f"Unable to hash {emoji.name}({emoji.id}): {e}")
+                        return
+                    await asyncio.sleep(2 ** attempt)
+                except Exception as e:
+                    # unreadable images and dropped connections only skip this emoji.
+                    self.log.warning(f"Unable to hash {emoji.name}({emoji.id}): {e!r}")
+                    return
+                else:
+                    return emoji.id, str(img_hash)
+
+    async def flush(self, hashes: list[tuple[int, str]]) -> None:
+        if hashes:
+            await self.bot.db.bulk_update_emoji_hash(hashes)
+            hashes.clear()
+
+    async def run(self, emojis: list[PersonalEmoji]) -> None:
+        total = len(emojis)
+        report_every = max(total // 10, 1)
+        self.log.info(f"Rehashing {total} emoji(s) with a concurrency of {self.concurrency}.")
+        hashes: list[tuple[int, str]] = []
+        try:
+            for done, coro in enumerate(asyncio.as_completed([self.hash_emoji(e) for e in emojis]), start=1):
+                if (result := await coro) is not None:
+                    hashes.append(result)
+
+                if len(hashes) >= self.BATCH_SIZE:
+                    await self.flush(hashes)
+
+                if done % report_every == 0 or done == total:
+                    self.log.info(f"Rehashed {done}/{total} emoji(s).")
+        finally:
+            try:
+                await self.flush(hashes)  # hashes collected before a failure are kept too.
+            finally:
+                self.pending.difference_update(emoji.id for emoji in emojis)
+
+        await self.bot.save_snapshot()
+
+
+class EmojiBulkImporter:
+    """Saves many emojis for a user at once.
+
+    Emojis are downloaded, hashed and checked for duplicates in parallel under the bot's duplicate check limit,
+    while creating them stays one at a time through save_emoji.
+    """
+
+    def __init__(self, bot: StellaEmojiBot, user: discord.abc.Snowflake) -> None:
+        self.bot: StellaEmojiBot = bot
+        self.user: discord.abc.Snowflake = user
+        self.total: int = 0
+        self.saved: list[tuple[typing.Any, PersonalEmoji]] = []  # emoji asked to save and the emoji it became.
+        self.duplicates: list[EmojiImageDuplicates] = []
+        self.failed_downloads: list[tuple[typing.Any, Exception]] = []  # unable to read or hash.
+        self.failed: list[tuple[typing.Any, Exception]] = []  # unable to create.
+        self.log = logging.getLogger(f"{LOGGER_NAME}.import")
+
+    @property
+    def failures(self) -> int:
+        return len(self.failed_downloads) + len(self.failed)
+
+    @property
+    def done(self) -> int:
+        return len(self.saved) + len(self.duplicates) + self.failures
+
+    def owner(self, emoji: typing.Any) -> discord.abc.Snowflake:  # noqa
+        return self.user
+
+    async def prepare(self, emoji: typing.Any) -> tuple[bytes, imagehash.ImageHash]:
+        async with self.bot.duplicate_check_limit:
+            image = await emoji.read()
+            return image, await PersonalEmoji.to_byte_hash(image)
+
+    async def save(self, emoji: typing.Any, image: bytes, img_hash: imagehash.ImageHash) -> PersonalEmoji | None:
+        """Returns the emoji that was created, None when it's a duplicate or failed."""
+        # emojis saved earlier in this import are already in the catalogue, so they're compared too.
+        if similars := self.bot.find_hash_duplicates(img_hash):
+            self.duplicates.append(EmojiImageDuplicates(emoji, similars))
+            return None
+
+        try:
+            saved = await self.bot.save_emoji(
+                emoji, self.owner(emoji), duplicate_image=True, image=image, image_hash=img_hash, timeout=None
+            )
+        except Exception as e:
+            self.log.warning(f"Unable to save {emoji.name}: {e}")
+            self.failed.append((emoji, e))
+            return None
+
+        self.saved.append((emoji, saved))
+        return saved
+
+    async def run(
+            self, emojis: typing.Iterable[typing.Any],
+            on_progress: typing.Callable[[EmojiBulkImporter], typing.Awaitable[None]] | None = None, *,
+            window: int | None = None
+    ) -> EmojiBulkImporter:
+        """window bounds how many emojis are read ahead of being saved, every emoji is read at once when None."""
+        remaining = iter(emojis)
+        pending: dict[asyncio.Task, typing.Any] = {}
+
+        def read_ahead() -> None:
+            for emoji in itertools.islice(remaining, None if window is None else max(window - len(pending), 0)):
+                pending[asyncio.create_task(self.prepare(emoji))] = emoji
+                self.total += 1
+
+        read_ahead()
+        try:
+            while pending:
+                finished, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    emoji = pending.pop(task)
+                    try:
+                        image, img_hash = task.result()
+                    except Exception as e:
+                        self.log.warning(f"Unable to download {emoji.name}: {e}")
+                        self.failed_downloads.append((emoji, e))
+                    else:
+                        await self.save(emoji, image, img_hash)
+
+                    if on_progress is not None:
+                        try:
+                            await on_progress(self)
+                        except Exception as e:
+                            # a progress report is best effort, it must not stop the emojis still being saved.
+                            self.log.warning(f"Unable to report progress: {e!r}")
+                read_ahead()
+        finally:
+            for task in pending:
+                task.cancel()
+        return self
+
+
+class EmojiSnapshot:
+    """Compact local copy of the emoji catalogue, used to serve emojis before discord responds."""
+    FORMAT_VERSION = 1
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+
+    def _read(self) -> list[tuple[int, str, bool, str, int]]:
+        try:
+            with open(self.path, 'r') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return []
+
+        if data.get("version") != self.FORMAT_VERSION:
+            return []
+        return [tuple(row) for row in data["emojis"]]
+
+    def _write(self, rows: list[tuple[int, str, bool, str, int]]) -> None:
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as file:
+            json.dump({"version": self.FORMAT_VERSION, "emojis": rows}, file, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+    async def load(self) -> list[tuple[int, str, bool, str, int]]:
+        return await asyncio.to_thread(self._read)
+
+    async def save(self, emojis: typing.Iterable[PersonalEmoji]) -> None:
+        rows = [
+            (emoji.id, emoji.name, emoji.animated, emoji.hash_hex or '', emoji.added_by.id)
+            for emoji in emojis if emoji.added_by is not None
+        ]
+        await asyncio.to_thread(self._write, rows)
 
 
 class NormalDiscordEmoji:
@@ -336,6 +757,19 @@ class Tree(app_commands.CommandTree[StellaEmojiBot]):
         slash_context.set(interaction)
         return not interaction.client.is_owner_only or await interaction.client.is_owner(interaction.user)
 
+    async def _call(self, interaction: discord.Interaction[StellaEmojiBot]) -> None:
+        start = time.perf_counter()
+        try:
+            await super()._call(interaction)
+        finally:
+            elapsed = time.perf_counter() - start
+            command = interaction.command
+            name = command.qualified_name if command is not None else (interaction.data or {}).get('name', 'unknown')
+            if interaction.type is discord.InteractionType.autocomplete:
+                AUTOCOMPLETE_LATENCY.observe(elapsed, command=name)
+            else:
+                COMMAND_LATENCY.observe(elapsed, command=name, type="app")
+
     def update_slash_lookup(self, app_mapping: dict[list[dict[str, Any]]]):
         self._slash_hashes.clear()
         for scope, apps in app_mapping.items():
@@ -364,14 +798,30 @@ class Tree(app_commands.CommandTree[StellaEmojiBot]):
             if scope is not None and fallback:
                 return self.get_command_named(command, None)
 
+    @staticmethod
+    def scope_key(guild: discord.abc.Snowflake | None) -> str:
+        # same key json gives when dumping a None/int key.
+        return 'null' if guild is None else str(guild.id)
+
+    def scopes(self) -> list[discord.Object | None]:
+        guild_ids = {*self._guild_commands, *[guild_id for _, guild_id, _ in self._context_menus if guild_id]}
+        return [None, *[discord.Object(guild_id) for guild_id in sorted(guild_ids)]]
+
+    def command_hash(self, *, guild: discord.abc.Snowflake | None = None) -> str:
+        payload = [command.to_dict(self) for command in self.get_commands(guild=guild)]
+        payload.sort(key=lambda data: (data.get('type', 1), data['name']))
+        serialized = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode()).hexdigest()
+
     async def sync(self, *, guild: discord.abc.Snowflake | None = None) -> list[app_commands.AppCommand]:
+        command_hash = self.command_hash(guild=guild)
         slashs = await super().sync(guild=guild)
         meta = await self.client.db.fetch_metadata(VERSION)
-        d = meta.data.copy()
-        slash = d.get("slash_commands", {})
-        key = getattr(guild, 'id', None)
-        serialize = [slash.to_dict() for slash in slashs]
-        slash[key] = serialize
-        await self.client.append_metadata("slash_commands", slash)
+        new_meta = meta.data.copy()
+        key = self.scope_key(guild)
+        slash = new_meta.setdefault("slash_commands", {})
+        slash[key] = [app.to_dict() for app in slashs]
+        new_meta.setdefault("slash_hashes", {})[key] = command_hash
+        await self.client.db.update_metadata(meta.id, new_meta)
         self.update_slash_lookup(slash)
         return slashs
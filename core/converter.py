@@ -83,7 +83,7 @@ class FavouriteEmojiConverter(PersonalEmojiConverter):
         user = ctx.author
         emoji = await PersonalEmoji.convert(ctx, argument)
         await ctx.bot.ensure_bulk_favourite_user(user)
-        if user.id in emoji.favourites:
+        if emoji.is_favourite(user.id):
             return emoji
 
         raise NotEmojiFavourite(emoji)
@@ -92,7 +92,7 @@ class FavouriteEmojiConverter(PersonalEmojiConverter):
         user = interaction.user
         emoji = await PersonalEmoji.transform(interaction, value)
         await interaction.client.ensure_bulk_favourite_user(user)
-        if user.id in emoji.favourites:
+        if emoji.is_favourite(user.id):
             return emoji
 
         raise NotEmojiFavourite(emoji)
@@ -1,16 +1,27 @@
 from __future__ import annotations
 
+import collections
+import contextvars
 import datetime
+import functools
+import inspect
 import json
+import logging
 import sqlite3
+import time
 import typing
 from types import TracebackType
 
-import asqlite
-import asyncpg
+from core.metrics import DB_QUERY_LATENCY, DB_POOL_WAIT
+from utils.general import LOGGER_NAME
 
-T = typing.TypeVar('T', asyncpg.Pool, asqlite.Pool, covariant=True)
-TReturn = typing.TypeVar('TReturn', asyncpg.Record, sqlite3.Row, covariant=True)
+if typing.TYPE_CHECKING:
+    # drivers are imported by the backend that is chosen, see create_pool.
+    import asqlite
+    import asyncpg
+
+T = typing.TypeVar('T', 'asyncpg.Pool', 'asqlite.Pool', covariant=True)
+TReturn = typing.TypeVar('TReturn', 'asyncpg.Record', sqlite3.Row, covariant=True)
 
 
 class DbRecord(typing.Generic[T]):
@@ -25,12 +36,143 @@ class DbRecord(typing.Generic[T]):
 
 
 C = typing.TypeVar('C')
+_pool_waits: contextvars.ContextVar[list[float] | None] = contextvars.ContextVar('db_pool_waits', default=None)
+
+
+class TimedAcquire:
+    def __init__(self, acquiring: typing.Any) -> None:
+        self._acquiring = acquiring
+
+    async def __aenter__(self) -> typing.Any:
+        start = time.perf_counter()
+        conn = await self._acquiring.__aenter__()
+        if (waits := _pool_waits.get()) is not None:
+            waits.append(time.perf_counter() - start)
+        return conn
+
+    async def __aexit__(self, *exc_info: typing.Any) -> typing.Any:
+        return await self._acquiring.__aexit__(*exc_info)
+
+
+class InstrumentedPool:
+    """Pool proxy that records how long each query waited for a connection."""
+    _QUERY_METHODS = ('execute', 'executemany', 'fetch', 'fetchrow', 'fetchval', 'copy_records_to_table')
+
+    def __init__(self, pool: T) -> None:
+        self._pool: T = pool
+
+    def acquire(self, *args: typing.Any, **kwargs: typing.Any) -> TimedAcquire:
+        return TimedAcquire(self._pool.acquire(*args, **kwargs))
+
+    def __getattr__(self, item: str) -> typing.Any:
+        if item not in self._QUERY_METHODS:
+            return getattr(self._pool, item)
+
+        # the pool shortcuts acquire internally, go through our acquire so the wait is measured.
+        async def query(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            async with self.acquire() as conn:
+                return await getattr(conn, item)(*args, **kwargs)
+        return query
+
+
+class QueryStats:
+    __slots__ = ('calls', 'total', 'max', 'pool_wait', 'rows')
+
+    def __init__(self) -> None:
+        self.calls: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+        self.pool_wait: float = 0.0
+        self.rows: int = 0
+
+    def add(self, duration: float, pool_wait: float, rows: int) -> None:
+        self.calls += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.pool_wait += pool_wait
+        self.rows += rows
+
+
+class SlowQuery(typing.NamedTuple):
+    method: str
+    duration: float
+    pool_wait: float
+    rows: int
+    at: datetime.datetime
+
+
+def count_rows(result: typing.Any) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    return 1
+
+
+def instrumented(name: str, method: typing.Callable) -> typing.Callable:
+    @functools.wraps(method)
+    async def wrapper(self: DbManager, *args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+        waits = []
+        token = _pool_waits.set(waits)
+        start = time.perf_counter()
+        result = None
+        try:
+            result = await method(self, *args, **kwargs)
+            return result
+        finally:
+            _pool_waits.reset(token)
+            self.record_query(name, time.perf_counter() - start, sum(waits), count_rows(result))
+    return wrapper
 
 
 class DbManager(typing.Generic[T]):
-    def __init__(self, dsn: str) -> None:
+    _UNINSTRUMENTED_METHODS = ('init_database', 'create_pool')
+
+    def __init__(self, dsn: str, *, slow_query_threshold: float = 0.2) -> None:
         self.pool: T | None = None
         self.dsn: str = dsn
+        self.slow_query_threshold: float = slow_query_threshold
+        self.query_stats: dict[str, QueryStats] = collections.defaultdict(QueryStats)
+        self.slow_queries: collections.deque[SlowQuery] = collections.deque(maxlen=50)
+        self.log = logging.getLogger(f"{LOGGER_NAME}.db")
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        # every query method of a backend goes through the same instrumentation.
+        for name, method in [*vars(cls).items()]:
+            if name.startswith('_') or name in cls._UNINSTRUMENTED_METHODS or not inspect.iscoroutinefunction(method):
+                continue
+
+            setattr(cls, name, instrumented(name, method))
+
+    def record_query(self, method: str, duration: float, pool_wait: float, rows: int) -> None:
+        self.query_stats[method].add(duration, pool_wait, rows)
+        DB_QUERY_LATENCY.observe(duration, method=method)
+        DB_POOL_WAIT.observe(pool_wait, method=method)
+        if duration >= self.slow_query_threshold:
+            self.slow_queries.append(SlowQuery(method, duration, pool_wait, rows, datetime.datetime.now()))
+            self.log.warning(
+                f"Slow query {method} took {duration * 1000:.1f}ms "
+                f"({pool_wait * 1000:.1f}ms waiting for a connection, {rows} row(s))."
+            )
+
+    def report_lines(self) -> list[str]:
+        ranked = sorted(self.query_stats.items(), key=lambda item: item[1].total, reverse=True)
+        lines = [f"{'method':<28} {'calls':>6} {'avg ms':>8} {'max ms':>8} {'wait ms':>8} {'rows':>7}"]
+        for method, stat in ranked:
+            lines.append(
+                f"{method:<28} {stat.calls:>6} {stat.total / stat.calls * 1000:>8.1f} {stat.max * 1000:>8.1f} "
+                f"{stat.pool_wait / stat.calls * 1000:>8.1f} {stat.rows:>7}"
+            )
+
+        if self.slow_queries:
+            lines.append(f"Slow queries (>= {self.slow_query_threshold * 1000:.0f}ms):")
+            lines.extend(
+                f"{query.at:%H:%M:%S} {query.method} {query.duration * 1000:.1f}ms "
+                f"wait {query.pool_wait * 1000:.1f}ms rows {query.rows}"
+                for query in reversed(self.slow_queries)
+            )
+        return lines
 
     def wrap_or_none(self, data: TReturn | None, cls: type[C] | None = None) -> DbRecord[TReturn] | None:  # noqa
         if data is None:
@@ -68,6 +210,34 @@ class DbManager(typing.Generic[T]):
     async def bulk_remove_emojis(self, emojis_id: list[int]) -> None:
         pass
 
+    async def bulk_update_emoji_names(self, values: list[tuple[int, str]]) -> None:
+        pass
+
+    async def bulk_create_users(self, user_ids: list[int]) -> None:
+        pass
+
+    async def bulk_create_emojis(self, values: list[tuple[int, str, int, str]]) -> list[EmojiCustomDb]:
+        """Creates the emojis that don't exist yet, only the rows it inserted are returned."""
+        pass
+
+    async def bulk_update_emoji_hash(self, values: list[tuple[int, str]]) -> None:
+        pass
+
+    async def bulk_list_emoji_favourite(self, user_ids: list[int]) -> list[EmojiFavouriteDb]:
+        pass
+
+    async def bulk_upsert_emoji_usage(self, values: list[tuple[int, int, int]]) -> list[EmojiUsageDb]:
+        pass
+
+    async def bulk_fetch_emoji_usages(self, emoji_ids: list[int]) -> list[EmojiUsageDb]:
+        pass
+
+    async def bulk_list_emoji_favourite_of(self, emoji_ids: list[int]) -> list[EmojiFavouriteDb]:
+        pass
+
+    async def bulk_create_emoji_favourite(self, values: list[tuple[int, int]]) -> None:
+        pass
+
     async def init_database(self) -> None:
         raise NotImplemented("Implement init_database please")
 
@@ -75,7 +245,7 @@ class DbManager(typing.Generic[T]):
         raise NotImplemented("Implement a pool please")
 
     async def __aenter__(self) -> typing.Self:
-        self.pool = await self.create_pool()
+        self.pool = InstrumentedPool(await self.create_pool())
         return self
 
     async def __aexit__(
@@ -87,8 +257,16 @@ class DbManager(typing.Generic[T]):
         await self.pool.close()
 
 
-class DbPostgres(DbManager[asyncpg.Pool]):
+class DbPostgres(DbManager['asyncpg.Pool']):
+    COPY_THRESHOLD = 1000
+
+    @staticmethod
+    def unzip_columns(values: typing.Iterable[typing.Sequence[typing.Any]], size: int) -> list[list[typing.Any]]:
+        columns = [[*column] for column in zip(*values)]
+        return columns or [[] for _ in range(size)]
+
     async def create_pool(self) -> asyncpg.Pool:
+        import asyncpg
         return await asyncpg.create_pool(self.dsn)
 
     async def init_database(self):
@@ -153,7 +331,7 @@ class DbPostgres(DbManager[asyncpg.Pool]):
         await self.pool.execute("UPDATE emoji SET hash=$2 WHERE id=$1", emoji_id, image_hash)
 
     async def bulk_remove_emojis(self, emoji_ids: list[int]):
-        await self.pool.executemany("DELETE FROM emoji WHERE id=$1", [[x] for x in emoji_ids])
+        await self.pool.execute("DELETE FROM emoji WHERE id = ANY($1::bigint[])", emoji_ids)
 
     async def create_emoji_favourite(self, emoji_id: int, user_id: int) -> None:
         await self.pool.execute(
@@ -166,12 +344,110 @@ class DbPostgres(DbManager[asyncpg.Pool]):
         )
 
     async def bulk_update_emoji_names(self, values: list[tuple[int, str]]):
-        await self.pool.executemany("UPDATE emoji SET fullname=$2 WHERE id=$1", values)
+        emoji_ids, names = self.unzip_columns(values, 2)
+        await self.pool.execute(
+            """
+            UPDATE emoji SET fullname=v.fullname
+            FROM unnest($1::bigint[], $2::text[]) AS v(id, fullname)
+            WHERE emoji.id=v.id
+            """,
+            emoji_ids, names
+        )
+
+    async def bulk_create_emojis(self, values: list[tuple[int, str, int, str]]) -> list[EmojiCustomDb]:
+        emoji_ids, names, added_bys, hashes = self.unzip_columns(values, 4)
+        records = await self.pool.fetch(
+            """
+            INSERT INTO emoji(id, fullname, added_by, hash)
+            SELECT * FROM unnest($1::bigint[], $2::text[], $3::bigint[], $4::text[])
+            ON CONFLICT(id) DO NOTHING RETURNING *
+            """,
+            emoji_ids, names, added_bys, hashes
+        )
+        return [self.wrap_or_none(record, cls=EmojiCustomDb) for record in records]
+
+    async def bulk_update_emoji_hash(self, values: list[tuple[int, str]]) -> None:
+        emoji_ids, hashes = self.unzip_columns(values, 2)
+        await self.pool.execute(
+            """
+            UPDATE emoji SET hash=v.hash
+            FROM unnest($1::bigint[], $2::text[]) AS v(id, hash)
+            WHERE emoji.id=v.id
+            """,
+            emoji_ids, hashes
+        )
+
+    async def bulk_create_users(self, user_ids: list[int]) -> None:
+        await self.pool.execute(
+            "INSERT INTO discord_user(id) SELECT DISTINCT unnest($1::bigint[]) ON CONFLICT(id) DO NOTHING",
+            user_ids
+        )
+
+    async def bulk_list_emoji_favourite(self, user_ids: list[int]) -> list[EmojiFavouriteDb]:
+        records = await self.pool.fetch(
+            "SELECT * FROM emoji_favourite WHERE user_id = ANY($1::bigint[])", user_ids
+        )
+        return [self.wrap_or_none(record, cls=EmojiFavouriteDb) for record in records]
+
+    async def bulk_upsert_emoji_usage(self, values: list[tuple[int, int, int]]) -> list[EmojiUsageDb]:
+        if len(values) < self.COPY_THRESHOLD:
+            emoji_ids, user_ids, amounts = self.unzip_columns(values, 3)
+            records = await self.pool.fetch(
+                """
+                INSERT INTO emoji_used (emoji_id, user_id, amount)
+                SELECT emoji_id, user_id, SUM(amount)
+                FROM unnest($1::bigint[], $2::bigint[], $3::int[]) AS v(emoji_id, user_id, amount)
+                GROUP BY emoji_id, user_id
+                ON CONFLICT (emoji_id, user_id)
+                DO UPDATE SET amount = emoji_used.amount + EXCLUDED.amount
+                RETURNING *
+                """,
+                emoji_ids, user_ids, amounts
+            )
+            return [self.wrap_or_none(record, cls=EmojiUsageDb) for record in records]
+
+        # Large flushes are streamed with COPY into a temporary table and merged in the same transaction.
+        async with self.pool.acquire() as conn, conn.transaction():
+            await conn.execute(
+                "CREATE TEMP TABLE emoji_used_staging(emoji_id BIGINT, user_id BIGINT, amount INT) ON COMMIT DROP"
+            )
+            await conn.copy_records_to_table(
+                'emoji_used_staging', records=values, columns=('emoji_id', 'user_id', 'amount')
+            )
+            records = await conn.fetch(
+                """
+                INSERT INTO emoji_used (emoji_id, user_id, amount)
+                SELECT emoji_id, user_id, SUM(amount) FROM emoji_used_staging
+                GROUP BY emoji_id, user_id
+                ON CONFLICT (emoji_id, user_id)
+                DO UPDATE SET amount = emoji_used.amount + EXCLUDED.amount
+                RETURNING *
+                """
+            )
+        return [self.wrap_or_none(record, cls=EmojiUsageDb) for record in records]
 
     async def list_emoji_favourite(self, user_id: int) -> list[EmojiFavouriteDb]:
         records = await self.pool.fetch("SELECT * FROM emoji_favourite WHERE user_id=$1", user_id)
         return [self.wrap_or_none(record, cls=EmojiFavouriteDb) for record in records]
 
+    async def bulk_fetch_emoji_usages(self, emoji_ids: list[int]) -> list[EmojiUsageDb]:
+        records = await self.pool.fetch("SELECT * FROM emoji_used WHERE emoji_id = ANY($1::bigint[])", emoji_ids)
+        return [EmojiUsageDb(record) for record in map(DbRecord, records)]
+
+    async def bulk_list_emoji_favourite_of(self, emoji_ids: list[int]) -> list[EmojiFavouriteDb]:
+        records = await self.pool.fetch(
+            "SELECT * FROM emoji_favourite WHERE emoji_id = ANY($1::bigint[])", emoji_ids
+        )
+        return [self.wrap_or_none(record, cls=EmojiFavouriteDb) for record in records]
+
+    async def bulk_create_emoji_favourite(self, values: list[tuple[int, int]]) -> None:
+        emoji_ids, user_ids = self.unzip_columns(values, 2)
+        await self.pool.execute(
+            "INSERT INTO emoji_favourite(emoji_id, user_id) SELECT * FROM unnest($1::bigint[], $2::bigint[]) "
+            "ON CONFLICT (emoji_id, user_id) DO NOTHING",
+            emoji_ids, user_ids
+        )
+
     async def fetch_metadata(self, version: str) -> MetadataDb:
         record = await self.pool.fetchrow(
             "INSERT INTO bot_metadata(bot_version, data) VALUES($1, $2) "
@@ -187,8 +463,12 @@ class DbPostgres(DbManager[asyncpg.Pool]):
 SQLITE_RECORD = DbRecord[dict[str, typing.Any]]
 
 
-class DbSqlite(DbManager[asqlite.Pool]):
+class DbSqlite(DbManager['asqlite.Pool']):
     _emoji_keys = ['id', 'fullname', 'added_by', 'hash']
+    # RETURNING was added in sqlite 3.35.0, older builds fallback into a separate SELECT.
+    supports_returning: bool = sqlite3.sqlite_version_info >= (3, 35, 0)
+    # builds older than 3.32.0 allow no more than 999 variables in one statement.
+    MAX_VARIABLES = 900
 
     def _sqlite_datetime(self, data: int) -> datetime.datetime:
         return datetime.datetime.fromisoformat(data).replace(tzinfo=datetime.timezone.utc)
@@ -196,6 +476,22 @@ class DbSqlite(DbManager[asqlite.Pool]):
     def stmt_star(self, stmt: str, keys: list[str]) -> str:
         return stmt.replace('*', ','.join([key if isinstance(key, str) else key[0] for key in keys]))
 
+    async def _fetch_in(
+            self, conn: asqlite.Connection, stmt: str, values: list[typing.Any], *, size: int = 1
+    ) -> list[sqlite3.Row]:
+        """Runs stmt with its {} filled by placeholders for as many values as fit, until every value is sent.
+
+        Values are tuples of size columns when size is above 1, such as (emoji_id, user_id) IN (VALUES {}).
+        """
+        step = self.MAX_VARIABLES // size
+        placeholder = '?' if size == 1 else f"({','.join('?' * size)})"
+        records = []
+        for start in range(0, len(values), step):
+            chunk = values[start:start + step]
+            params = chunk if size == 1 else [value for row in chunk for value in row]
+            records.extend(await conn.fetchall(stmt.format(','.join([placeholder] * len(chunk))), tuple(params)))
+        return records
+
     def wrap_key_or_none(self, data: SQLITE_RECORD | None, keys: list[str | tuple[str, typing.Callable]],
                          cls: type[C] | None = None) -> C | None:
         if data is not None:
@@ -205,6 +501,7 @@ class DbSqlite(DbManager[asqlite.Pool]):
             ), cls=cls)
 
     async def create_pool(self) -> asqlite.Pool:
+        import asqlite
         return await asqlite.create_pool(self.dsn)
 
     async def init_database(self) -> None:
@@ -243,13 +540,21 @@ class DbSqlite(DbManager[asqlite.Pool]):
             ('created_at', self._sqlite_datetime)
         ]
         async with self.pool.acquire() as conn:
-            stmt = (
-                "INSERT INTO bot_metadata(bot_version, data) VALUES(?, ?) "
-                "ON CONFLICT (bot_version) DO NOTHING"
-            )
-            await conn.execute(stmt, version, "{}")
-            stmt = self.stmt_star("SELECT * FROM bot_metadata WHERE bot_version=?", keys)
-            data = await conn.fetchone(stmt, (version,))
+            if self.supports_returning:
+                stmt = self.stmt_star(
+                    "INSERT INTO bot_metadata(bot_version, data) VALUES(?, ?) "
+                    "ON CONFLICT (bot_version) DO UPDATE SET "
+                    "bot_version=excluded.bot_version RETURNING *", keys
+                )
+                data = await conn.fetchone(stmt, (version, "{}"))
+            else:
+                stmt = (
+                    "INSERT INTO bot_metadata(bot_version, data) VALUES(?, ?) "
+                    "ON CONFLICT (bot_version) DO NOTHING"
+                )
+                await conn.execute(stmt, version, "{}")
+                stmt = self.stmt_star("SELECT * FROM bot_metadata WHERE bot_version=?", keys)
+                data = await conn.fetchone(stmt, (version,))
             return self.wrap_key_or_none(data, keys, cls=MetadataDb)
 
     async def update_metadata(self, id: int, data: dict[str, typing.Any]) -> None:
@@ -274,12 +579,20 @@ class DbSqlite(DbManager[asqlite.Pool]):
         keys = UserDb.__slots__
         async with self.pool.acquire() as conn:
             value = user_id,
-            await conn.execute(
-                "INSERT INTO discord_user(id) VALUES(?) "
-                "ON CONFLICT(id) "
-                f"DO NOTHING", value
-            )
-            data = await conn.fetchone(self.stmt_star("SELECT * FROM discord_user WHERE id=?", keys), value)
+            if self.supports_returning:
+                stmt = self.stmt_star(
+                    "INSERT INTO discord_user(id) VALUES(?) "
+                    "ON CONFLICT(id) "
+                    "DO UPDATE SET id=excluded.id RETURNING *", keys
+                )
+                data = await conn.fetchone(stmt, value)
+            else:
+                await conn.execute(
+                    "INSERT INTO discord_user(id) VALUES(?) "
+                    "ON CONFLICT(id) "
+                    f"DO NOTHING", value
+                )
+                data = await conn.fetchone(self.stmt_star("SELECT * FROM discord_user WHERE id=?", keys), value)
         return self.wrap_key_or_none(data, keys, cls=UserDb)
 
     async def create_emoji(self, emoji_id: int, fullname: str, added_by: int, image_hash: str) -> EmojiCustomDb:
@@ -288,10 +601,18 @@ class DbSqlite(DbManager[asqlite.Pool]):
             "DO NOTHING"
         )
         keys = EmojiCustomDb.__slots__
+        values = (emoji_id, fullname, added_by, image_hash)
         async with self.pool.acquire() as conn:
-            await conn.execute(stmt, (emoji_id, fullname, added_by, image_hash))
-            get_stmt = self.stmt_star("SELECT * FROM emoji WHERE id=?", keys)
-            data = await conn.fetchone(get_stmt, (emoji_id,))
+            if self.supports_returning:
+                stmt = self.stmt_star(
+                    "INSERT INTO emoji(id, fullname, added_by, hash) VALUES(?, ?, ?, ?) ON CONFLICT(id) "
+                    "DO UPDATE SET id=excluded.id RETURNING *", keys
+                )
+                data = await conn.fetchone(stmt, values)
+            else:
+                await conn.execute(stmt, values)
+                get_stmt = self.stmt_star("SELECT * FROM emoji WHERE id=?", keys)
+                data = await conn.fetchone(get_stmt, (emoji_id,))
         return self.wrap_key_or_none(data, keys, cls=EmojiCustomDb)
 
     async def create_normal_emojis(self, data: dict[str, str]) -> None:
@@ -314,19 +635,20 @@ class DbSqlite(DbManager[asqlite.Pool]):
         return [self.wrap_key_or_none(record, EmojiFavouriteDb.__slots__, cls=EmojiFavouriteDb) for record in records]
 
     async def upsert_emoji_usage(self, emoji_id: int, user_id: int, amount: int) -> SQLITE_RECORD:
+        keys = EmojiUsageDb.__slots__
+        stmt = """
+            INSERT INTO emoji_used (emoji_id, user_id, amount)
+            VALUES (?, ?, ?)
+            ON CONFLICT (emoji_id, user_id)
+            DO UPDATE SET amount = emoji_used.amount + excluded.amount
+        """
         async with self.pool.acquire() as conn:
-            await conn.execute(
-                """
-                INSERT INTO emoji_used (emoji_id, user_id, amount)
-                VALUES (?, ?, ?)
-                ON CONFLICT (emoji_id, user_id)
-                DO UPDATE SET amount = emoji_used.amount + excluded.amount
-                """,
-                (emoji_id, user_id, amount)
-            )
-            keys = EmojiUsageDb.__slots__
-            stmt = self.stmt_star("SELECT * FROM emoji_used WHERE emoji_id=?", keys)
-            data = await conn.fetchone(stmt, (emoji_id,))
+            if self.supports_returning:
+                data = await conn.fetchone(self.stmt_star(f"{stmt} RETURNING *", keys), (emoji_id, user_id, amount))
+            else:
+                await conn.execute(stmt, (emoji_id, user_id, amount))
+                stmt = self.stmt_star("SELECT * FROM emoji_used WHERE emoji_id=? AND user_id=?", keys)
+                data = await conn.fetchone(stmt, (emoji_id, user_id))
         return self.wrap_key_or_none(data, keys, cls=EmojiUsageDb)
 
     async def update_emoji_hash(self, emoji_id: int, image_hash: str) -> None:
@@ -350,6 +672,78 @@ class DbSqlite(DbManager[asqlite.Pool]):
             else:
                 await conn.executemany(query, [(x,) for x in emoji_ids])
 
+    async def bulk_create_emojis(self, values: list[tuple[int, str, int, str]]) -> list[EmojiCustomDb]:
+        keys = EmojiCustomDb.__slots__
+        emoji_ids = [*dict.fromkeys(emoji_id for emoji_id, *_ in values)]
+        async with self.pool.acquire() as conn:
+            # rows that already existed are left out, same as ON CONFLICT DO NOTHING RETURNING on postgres.
+            rows = await self._fetch_in(conn, "SELECT id FROM emoji WHERE id IN ({})", emoji_ids)
+            existing = {row[0] for row in rows}
+            await conn.executemany(
+                "INSERT INTO emoji(id, fullname, added_by, hash) VALUES(?, ?, ?, ?) ON CONFLICT(id) DO NOTHING", values
+            )
+            stmt = self.stmt_star("SELECT * FROM emoji WHERE id IN ({})", keys)
+            records = await self._fetch_in(conn, stmt, [emoji_id for emoji_id in emoji_ids if emoji_id not in existing])
+
+        return [self.wrap_key_or_none(record, keys, cls=EmojiCustomDb) for record in records]
+
+    async def bulk_update_emoji_hash(self, values: list[tuple[int, str]]) -> None:
+        async with self.pool.acquire() as conn:
+            await conn.executemany("UPDATE emoji SET hash=? WHERE id=?", [(y, x) for x, y in values])
+
+    async def bulk_create_users(self, user_ids: list[int]) -> None:
+        async with self.pool.acquire() as conn:
+            await conn.executemany(
+                "INSERT INTO discord_user(id) VALUES(?) ON CONFLICT(id) DO NOTHING", [(x,) for x in user_ids]
+            )
+
+    async def bulk_list_emoji_favourite(self, user_ids: list[int]) -> list[EmojiFavouriteDb]:
+        keys = EmojiFavouriteDb.__slots__
+        async with self.pool.acquire() as conn:
+            stmt = self.stmt_star("SELECT * FROM emoji_favourite WHERE user_id IN ({})", keys)
+            records = await self._fetch_in(conn, stmt, user_ids)
+
+        return [self.wrap_key_or_none(record, keys, cls=EmojiFavouriteDb) for record in records]
+
+    async def bulk_upsert_emoji_usage(self, values: list[tuple[int, int, int]]) -> list[EmojiUsageDb]:
+        keys = EmojiUsageDb.__slots__
+        stmt = """
+            INSERT INTO emoji_used (emoji_id, user_id, amount)
+            VALUES (?, ?, ?)
+            ON CONFLICT (emoji_id, user_id)
+            DO UPDATE SET amount = emoji_used.amount + excluded.amount
+        """
+        async with self.pool.acquire() as conn:
+            await conn.executemany(stmt, values)
+            # read back once the amounts are final, a pair may appear more than once in values.
+            pairs = [*dict.fromkeys((emoji_id, user_id) for emoji_id, user_id, _ in values)]
+            stmt = self.stmt_star("SELECT * FROM emoji_used WHERE (emoji_id, user_id) IN (VALUES {})", keys)
+            records = await self._fetch_in(conn, stmt, pairs, size=2)
+        return [self.wrap_key_or_none(record, keys, cls=EmojiUsageDb) for record in records]
+
+    async def bulk_fetch_emoji_usages(self, emoji_ids: list[int]) -> list[EmojiUsageDb]:
+        keys = EmojiUsageDb.__slots__
+        async with self.pool.acquire() as conn:
+            stmt = self.stmt_star("SELECT * FROM emoji_used WHERE emoji_id IN ({})", keys)
+            records = await self._fetch_in(conn, stmt, emoji_ids)
+
+        return [self.wrap_key_or_none(record, keys, cls=EmojiUsageDb) for record in records]
+
+    async def bulk_list_emoji_favourite_of(self, emoji_ids: list[int]) -> list[EmojiFavouriteDb]:
+        keys = EmojiFavouriteDb.__slots__
+        async with self.pool.acquire() as conn:
+            stmt = self.stmt_star("SELECT * FROM emoji_favourite WHERE emoji_id IN ({})", keys)
+            records = await self._fetch_in(conn, stmt, emoji_ids)
+
+        return [self.wrap_key_or_none(record, keys, cls=EmojiFavouriteDb) for record in records]
+
+    async def bulk_create_emoji_favourite(self, values: list[tuple[int, int]]) -> None:
+        async with self.pool.acquire() as conn:
+            await conn.executemany(
+                "INSERT INTO emoji_favourite(emoji_id, user_id) VALUES(?, ?) ON CONFLICT(emoji_id, user_id) DO NOTHING",
+                values
+            )
+
 
 class EmojiCustomDb(typing.Generic[T]):
     __slots__ = ('id', 'fullname', 'added_by', 'hash')
@@ -26,6 +26,15 @@ class EmojiNameDuplicates(UserInputError):
         self.conflict = conflict
 
 
+class MutationSuperseded(UserInputError):
+    """A queued change that was dropped because a later change made it pointless."""
+
+
+class MutationPending(UserInputError):
+    def __init__(self):
+        super().__init__("Discord is busy right now, your change is queued and will be applied shortly.")
+
+
 class NotEmojiOwner(commands.UserInputError):
     def __init__(self, emoji: PersonalEmoji):
         super().__init__(f"Only {emoji.added_by} can modify {emoji}!")
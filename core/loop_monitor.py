@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from utils.general import LOGGER_NAME
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop runs scheduled callbacks.
+
+    A watchdog thread checks the heartbeat written by the sampler, so when the loop is blocked by sync work
+    it can still log the stack that is currently running on the loop's thread.
+    """
+
+    def __init__(self, *, threshold: float = 0.25, interval: float = 0.25) -> None:
+        self.threshold: float = threshold
+        self.interval: float = interval
+        self.lag: float = 0.0
+        self.max_lag: float = 0.0
+        self._heartbeat: float = time.monotonic()
+        self._reported_heartbeat: float | None = None
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stopped: threading.Event = threading.Event()
+        self.log = logging.getLogger(f"{LOGGER_NAME}.loop")
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self.sample())
+        self._thread = threading.Thread(target=self.watchdog, name="stemoji-loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lag = max(loop.time() - start - self.interval, 0.0)
+            self.max_lag = max(self.max_lag, self.lag)
+            self._heartbeat = time.monotonic()
+            if self.lag >= self.threshold:
+                self.log.warning(f"Event loop lagged by {self.lag * 1000:.0f}ms.")
+
+    def watchdog(self) -> None:
+        while not self._stopped.wait(self.interval):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked < self.threshold or self._reported_heartbeat == heartbeat:
+                continue
+
+            self._reported_heartbeat = heartbeat  # once per stall
+            frame = sys._current_frames().get(self._loop_thread_id)  # noqa
+            if frame is None:
+                continue
+
+            stack = "".join(traceback.format_stack(frame))
+            self.log.warning(f"Event loop blocked for {blocked * 1000:.0f}ms so far, currently running:\n{stack}")
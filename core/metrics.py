@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import bisect
+import logging
+import math
+import typing
+
+from utils.general import LOGGER_NAME
+
+if typing.TYPE_CHECKING:
+    from aiohttp import web
+    from core.client import StellaEmojiBot
+
+LabelValues = tuple[str, ...]
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+def format_labels(names: typing.Sequence[str], values: typing.Sequence[str]) -> str:
+    if not names:
+        return ""
+
+    def escape(value: str) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Metric:
+    kind: str = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: typing.Sequence[str] = ()) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labelnames: tuple[str, ...] = tuple(labelnames)
+
+    def label_values(self, labels: dict[str, typing.Any]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> typing.Iterator[tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{labels} {format_value(value)}" for name, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: typing.Any) -> None:
+        key = self.label_values(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels: typing.Any) -> float:
+        return self.values.get(self.label_values(labels), 0)
+
+    def samples(self) -> typing.Iterator[tuple[str, str, float]]:
+        for key, value in self.values.items():
+            yield self.name, format_labels(self.labelnames, key), value
+
+
+class Gauge(Metric):
+    """Gauge that is either set directly, or read from a callback when scraped."""
+    kind = "gauge"
+
+    def __init__(
+            self, *args, function: typing.Callable[[], float | dict[LabelValues, float]] | None = None, **kwargs
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.values: dict[LabelValues, float] = {}
+        self.function = function
+
+    def set(self, value: float, **labels: typing.Any) -> None:
+        self.values[self.label_values(labels)] = value
+
+    def samples(self) -> typing.Iterator[tuple[str, str, float]]:
+        values = self.values
+        if self.function is not None:
+            result = self.function()
+            values = result if isinstance(result, dict) else {(): result}
+
+        for key, value in values.items():
+            yield self.name, format_labels(self.labelnames, key), value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: typing.Sequence[float] = DEFAULT_BUCKETS, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets))
+        self.counts: dict[LabelValues, list[int]] = {}
+        self.sums: dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: typing.Any) -> None:
+        key = self.label_values(labels)
+        if (counts := self.counts.get(key)) is None:
+            counts = self.counts[key] = [0] * (len(self.buckets) + 1)
+            self.sums[key] = 0.0
+
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sums[key] += value
+
+    def samples(self) -> typing.Iterator[tuple[str, str, float]]:
+        labelnames = (*self.labelnames, "le")
+        for key, counts in self.counts.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", format_labels(labelnames, (*key, format_value(bound))), cumulative
+
+            labels = format_labels(self.labelnames, key)
+            yield f"{self.name}_sum", labels, self.sums[key]
+            yield f"{self.name}_count", labels, cumulative
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name: str) -> None:
+        self.metrics.pop(name, None)
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+COMMAND_LATENCY = REGISTRY.register(Histogram(
+    "stemoji_command_duration_seconds", "Time taken to run a command.", ("command", "type")
+))
+AUTOCOMPLETE_LATENCY = REGISTRY.register(Histogram(
+    "stemoji_autocomplete_duration_seconds", "Time taken to answer an autocomplete.", ("command",)
+))
+DB_QUERY_LATENCY = REGISTRY.register(Histogram(
+    "stemoji_db_query_duration_seconds", "Time taken by each DbManager method.", ("method",)
+))
+DB_POOL_WAIT = REGISTRY.register(Histogram(
+    "stemoji_db_pool_wait_seconds", "Time each DbManager method waited for a pool connection.", ("method",)
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "stemoji_cache_requests_total", "Cache lookups by result.", ("cache", "result")
+))
+
+
+class MetricsServer:
+    """Local http server exposing the registry in prometheus text format."""
+
+    def __init__(self, bot: StellaEmojiBot, host: str, port: int, *, registry: MetricsRegistry = REGISTRY) -> None:
+        self.bot: StellaEmojiBot = bot
+        self.host: str = host
+        self.port: int = port
+        self.registry: MetricsRegistry = registry
+        self.runner: web.AppRunner | None = None
+        self.log = logging.getLogger(f"{LOGGER_NAME}.metrics")
+
+    def register_bot_gauges(self) -> None:
+        bot = self.bot
+        registry = self.registry
+        registry.register(Gauge(
+            "stemoji_gateway_latency_seconds", "Latency between a heartbeat and its ack.", function=lambda: bot.latency
+        ))
+        registry.register(Gauge(
+            "stemoji_event_loop_lag_seconds", "Delay of a scheduled callback on the event loop.",
+            function=lambda: bot.loop_monitor.lag
+        ))
+        registry.register(Gauge(
+            "stemoji_pending_usage_flushes", "Emoji usages waiting to be written to the database.",
+            function=lambda: sum(emoji.pending_usage_updates for emoji in bot.emojis_users.values())
+        ))
+        registry.register(Gauge(
+            "stemoji_emojis", "Emojis in the catalogue.", function=lambda: len(bot.emojis_users)
+        ))
+        registry.register(Gauge(
+            "stemoji_pending_mutations", "Emoji and profile changes waiting for their turn.",
+            function=lambda: len(bot.mutations)
+        ))
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        from aiohttp import web
+        return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self) -> None:
+        from aiohttp import web
+        self.register_bot_gauges()
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        self.log.info(f"Serving metrics at http://{self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
+
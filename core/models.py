@@ -2,17 +2,14 @@ from __future__ import annotations
 
 import asyncio
 import dataclasses
+import datetime
 import io
 import logging
 import re
-from collections import defaultdict
-from typing import Generator, Self
+from typing import Any, Generator, Self, Sequence, TYPE_CHECKING
 
-import asyncpg
 import discord
-import imagehash
 import starlight
-from PIL import Image
 from discord import app_commands
 from discord.app_commands import Choice
 
@@ -21,6 +18,21 @@ from core.typings import EContext, EInteraction, StellaEmojiBot
 from utils.general import emoji_context, LOGGER_NAME
 from utils.parsers import FuzzyInsensitive
 
+if TYPE_CHECKING:
+    import asyncpg
+    import imagehash
+    from core.db import EmojiCustomDb
+
+
+def compute_image_hash(image_bytes: bytes) -> imagehash.ImageHash:
+    # imagehash pulls numpy, scipy and PyWavelets, only pay for it on the first hash.
+    import imagehash
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        return imagehash.phash(img)
+
+
 @dataclasses.dataclass
 class DownloadedEmoji:
     name: str
@@ -33,41 +45,113 @@ class DownloadedEmoji:
     async def read(self):
         return self.image_bytes
 
-@dataclasses.dataclass
+
 class PersonalEmoji:
     CUSTOM_EMOJI_RE = re.compile(r'<?(?:(?P<animated>a)?:)?(?P<name>[A-Za-z0-9_]+):(?P<id>[0-9]{13,20})>?')
     USED_FORMATTER_RE = re.compile(r'u(?P<used>\d*)')
+    # usages and favourites live in bot.user_states, pending flushes are only allocated once the emoji is used.
+    __slots__ = (
+        'emoji', 'bot', 'db_data', 'added_by', 'hash_hex', '_image_hash', '_recent_emoji_usage', '_update_tasks',
+        '_lock',
+    )
 
     def __init__(self, bot: StellaEmojiBot, emoji: discord.Emoji | discord.PartialEmoji):
         self.emoji: discord.Emoji | discord.PartialEmoji = emoji
         self.bot: StellaEmojiBot = bot
         self.db_data: asyncpg.Record | None = None
-        self._recent_emoji_usage: dict[int, int] = defaultdict(int)
-        self.usages: dict[int, int] = defaultdict(int)
-        self.favourites: set[int] = set()
-        self.update_tasks: dict[int, asyncio.Task] = {}
-        self.lock: asyncio.Lock = asyncio.Lock()
-        self.image_hash: imagehash.ImageHash | None = None
-        self.added_by: discord.User | discord.Member | discord.Object = None
+        self.added_by: discord.User | discord.Member | discord.Object | None = None
+        self.hash_hex: str | None = None
+        self._image_hash: imagehash.ImageHash | None = None
+        self._recent_emoji_usage: dict[int, int] | None = None
+        self._update_tasks: dict[int, asyncio.Task] | None = None
+        self._lock: asyncio.Lock | None = None
+
+    @property
+    def id(self) -> int:
+        return self.emoji.id
+
+    @property
+    def name(self) -> str:
+        return self.emoji.name
+
+    @property
+    def animated(self) -> bool:
+        return self.emoji.animated
+
+    @property
+    def url(self) -> str:
+        return self.emoji.url
+
+    @property
+    def created_at(self) -> datetime.datetime:
+        return self.emoji.created_at
+
+    async def read(self) -> bytes:
+        return await self.emoji.read()
+
+    async def to_file(self, **kwargs: Any) -> discord.File:
+        return await self.emoji.to_file(**kwargs)
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    @property
+    def pending_usage_updates(self) -> int:
+        return len(self._update_tasks) if self._update_tasks else 0
+
+    def usage_of(self, user_id: int) -> int:
+        state = self.bot.user_states.peek(user_id)
+        return 0 if state is None else state.usages.get(self.id, 0)
+
+    def set_usage(self, user_id: int, amount: int) -> None:
+        # users that aren't cached are loaded from the database when they're needed again.
+        if (state := self.bot.user_states.peek(user_id)) is not None:
+            state.usages[self.id] = amount
+
+    def is_favourite(self, user_id: int) -> bool:
+        state = self.bot.user_states.peek(user_id)
+        return state is not None and self.id in state.favourites
+
+    def set_favourite(self, user_id: int, favourite: bool = True) -> None:
+        if (state := self.bot.user_states.peek(user_id)) is not None:
+            state.set_favourite(self.id, favourite)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, PersonalEmoji) and other.id == self.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
 
     def to_choice_usage(self, user_id: int) -> Choice:
         return Choice(name=f"{self.name}", value=str(self.id))
 
+    @property
+    def image_hash(self) -> imagehash.ImageHash | None:
+        if self._image_hash is None and self.hash_hex:
+            import imagehash
+            self._image_hash = imagehash.hex_to_hash(self.hash_hex)
+        return self._image_hash
+
+    @image_hash.setter
+    def image_hash(self, value: imagehash.ImageHash | None) -> None:
+        self._image_hash = value
+        self.hash_hex = None if value is None else str(value)
+
     async def create_image_hash(self) -> imagehash.ImageHash:
         self.image_hash = await self.to_image_hash(self.emoji)
         return self.image_hash
 
-    def generate_from_hash(self, img_hash: str) -> imagehash.ImageHash:
-        self.image_hash = imagehash.hex_to_hash(img_hash)
-        return self.image_hash
+    def generate_from_hash(self, img_hash: str) -> None:
+        # converted into an ImageHash only when it's compared.
+        self._image_hash = None
+        self.hash_hex = img_hash
 
     @staticmethod
     async def to_byte_hash(emoji_bytes: bytes) -> imagehash.ImageHash:
-        def form_hash(_byte):
-            with Image.open(io.BytesIO(_byte)) as img:
-                return imagehash.phash(img)
-
-        return await asyncio.to_thread(form_hash, emoji_bytes)
+        return await asyncio.to_thread(compute_image_hash, emoji_bytes)
 
     @staticmethod
     async def to_image_hash(emoji: discord.Emoji | discord.PartialEmoji | PersonalEmoji) -> imagehash.ImageHash:
@@ -94,9 +178,6 @@ class PersonalEmoji:
             format_spec = self.USED_FORMATTER_RE.sub("", format_spec)
         return super().__format__(format_spec)
 
-    def __getattr__(self, item):
-        return getattr(self.emoji, item)
-
     async def resolve_owner(self) -> discord.User | discord.Member:
         if self.added_by is None:
             await self.ensure()
@@ -106,6 +187,17 @@ class PersonalEmoji:
 
         return self.added_by
 
+    @staticmethod
+    async def resolve_owners(
+            emojis: Sequence[PersonalEmoji], limit: asyncio.Semaphore
+    ) -> list[discord.User | discord.Member]:
+        """Resolves the owners concurrently, no more than the semaphore allows at once."""
+        async def resolve(emoji: PersonalEmoji) -> discord.User | discord.Member:
+            async with limit:
+                return await emoji.resolve_owner()
+
+        return await asyncio.gather(*map(resolve, emojis))
+
     async def ensure(self, user: discord.User | discord.Member | discord.Object = None) -> asyncpg.Record:
         if self.db_data:
             return self.db_data
@@ -113,47 +205,58 @@ class PersonalEmoji:
         if user is None:
             data = await self.bot.db.fetch_emoji(self.id)
             if data is not None:
-                img_hash = data.hash
-                if img_hash != '':
-                    self.generate_from_hash(img_hash)
-                else:
-                    hashs = await self.create_image_hash()
-                    await self.bot.db.update_emoji_hash(self.id, str(hashs))
-                self.db_data = data
-                self.added_by = discord.Object(data.added_by)
+                self.hydrate(data)
+                if self.hash_hex is None:
+                    await self.rehash()
                 return self.db_data
 
         added = getattr(user, 'id', self.bot.user.id)
         added_by = discord.Object(added)
         await self.bot.ensure_user(added_by)
         self.added_by = user or added_by
-        img_hash = await self.create_image_hash()
+        img_hash = self.image_hash or await self.create_image_hash()  # known already when it was just saved.
         self.db_data = await self.bot.db.create_emoji(self.id, self.name, added, str(img_hash))
         return self.db_data
 
+    def hydrate(self, data: EmojiCustomDb) -> None:
+        """Fill this emoji from an existing db row without any queries. Empty hashes are left for rehash."""
+        self.db_data = data
+        if data.hash != '':
+            self.generate_from_hash(data.hash)
+        if not isinstance(self.added_by, (discord.User, discord.Member)) or self.added_by.id != data.added_by:
+            self.added_by = discord.Object(data.added_by)
+
+    async def rehash(self) -> imagehash.ImageHash:
+        img_hash = await self.create_image_hash()
+        await self.bot.db.update_emoji_hash(self.id, str(img_hash))
+        return img_hash
+
     def used(self, user: discord.User | discord.Member, value: int = 1) -> None:
-        self._recent_emoji_usage[user.id] += value
+        if self._recent_emoji_usage is None:
+            self._recent_emoji_usage = {}
+            self._update_tasks = {}
+
+        self._recent_emoji_usage[user.id] = self._recent_emoji_usage.get(user.id, 0) + value
         self.bot.dispatch('implicit_sent_emoji', user, self)
-        if user.id not in self.update_tasks:
-            self.update_tasks[user.id] = asyncio.create_task(self._delayed_used(user.id))
+        if user.id not in self._update_tasks:
+            self._update_tasks[user.id] = asyncio.create_task(self._delayed_used(user.id))
 
     async def user_usage(self, user: discord.User | discord.Member | discord.Object):
         record = await self.bot.db.upsert_emoji_usage(self.id, user.id, 0)
-        self.usages[user.id] = record.amount
+        self.set_usage(user.id, record.amount)
         return record.amount
 
     async def _delayed_used(self, user_id: int):
         await asyncio.sleep(5)
 
         async with self.lock:
-            value = self._recent_emoji_usage[user_id]
-            del self._recent_emoji_usage[user_id]
-            del self.update_tasks[user_id]
+            value = self._recent_emoji_usage.pop(user_id)
+            del self._update_tasks[user_id]
 
         await self.ensure()
         await self.bot.ensure_user(discord.Object(user_id))
         emoji_used = await self.bot.db.upsert_emoji_usage(self.id, user_id, value)
-        self.usages[user_id] = emoji_used.amount
+        self.set_usage(user_id, emoji_used.amount)
 
     async def rename(self, name: str) -> None:
         new_name = name.strip()
@@ -167,21 +270,32 @@ class PersonalEmoji:
         if not (3 <= len(new_name) < 33):
             raise ValueError("Emoji names must be inbetween 3 to 32 characters.")
 
-        self.emoji = await self.emoji.edit(name=new_name)
-        await self.bot.db.bulk_update_emoji_names([(self.id, new_name)])
+        await self.bot.wait_until_emoji_synced()  # snapshot emojis are partial and cannot be edited.
+        mutations = self.bot.mutations
+        await mutations.wait(mutations.submit('emoji', 'rename', self._apply_rename, key=self.id, name=new_name))
+
+    async def _apply_rename(self, name: str) -> None:
+        self.emoji = await self.emoji.edit(name=name)
+        await self.bot.db.bulk_update_emoji_names([(self.id, name)])
 
     async def delete(self, user: discord.Member | discord.User) -> None:
+        await self.bot.wait_until_emoji_synced()
+        mutations = self.bot.mutations
+        await mutations.wait(mutations.submit('emoji', 'delete', self._apply_delete, key=self.id, user=user))
+
+    async def _apply_delete(self, user: discord.Member | discord.User) -> None:
         await self.emoji.delete(reason=f"Remove requested by {user}.")
         await self.bot.db.bulk_remove_emojis([self.emoji.id])
-        del self.bot.emojis_users[self.emoji.id]
+        self.bot.emojis_users.pop(self.emoji.id, None)
+        self.bot.user_states.forget_emoji(self.emoji.id)
 
     async def favourite(self, user: discord.Object) -> None:
         await self.bot.db.create_emoji_favourite(self.id, user.id)
-        self.favourites.add(user.id)
+        self.set_favourite(user.id)
 
     async def unfavourite(self, user: discord.Object) -> None:
         await self.bot.db.remove_emoji_favourite(self.id, user.id)
-        self.favourites.remove(user.id)
+        self.set_favourite(user.id, False)
 
     @classmethod
     def find_all_emojis(cls, bot: StellaEmojiBot, content: str) -> Generator[Self, None, None]:
@@ -241,13 +355,13 @@ class PersonalEmoji:
             if task := bot.passive_bulk_favourite_user(interaction.user):
                 await task  # kinda strictly required so no choice
 
-            source = [emoji for emoji in bot.emojis_users.values() if user_id in emoji.favourites]
+            source = [emoji for emoji in bot.emojis_users.values() if emoji.is_favourite(user_id)]
         else:
             source = [*bot.emojis_users.values()]
 
         text_search = current.strip()
         if text_search == "":
-            source.sort(key=lambda e: e.usages[user_id], reverse=True)
+            source.sort(key=lambda e: e.usage_of(user_id), reverse=True)
             return [e.to_choice_usage(user_id) for e in source[:25]]
 
         choices = []
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import io
+import pstats
+import tracemalloc
+import typing
+
+import discord
+
+from core.errors import UserInputError
+
+ProfileMode = typing.Literal['cpu', 'memory', 'db', 'cache']
+
+
+class ProfileReport:
+    __slots__ = ('mode', 'seconds', 'lines', 'full_text')
+
+    def __init__(self, mode: str, seconds: float, lines: list[str], full_text: str) -> None:
+        self.mode: str = mode
+        self.seconds: float = seconds
+        self.lines: list[str] = lines
+        self.full_text: str = full_text
+
+    def to_file(self) -> discord.File:
+        return discord.File(io.BytesIO(self.full_text.encode()), filename=f"profile_{self.mode}.txt")
+
+
+class Profiler:
+    """Time bounded profiling that is only running while an owner asked for it."""
+
+    def __init__(self, *, top: int = 50) -> None:
+        self.top: int = top
+        self._lock: asyncio.Lock = asyncio.Lock()
+        self.sources: dict[str, typing.Callable[[], list[str]]] = {}
+
+    def add_source(self, mode: str, source: typing.Callable[[], list[str]]) -> None:
+        """Register a report that is collected continuously instead of over a profiling window."""
+        self.sources[mode] = source
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, mode: ProfileMode, seconds: float) -> ProfileReport:
+        if (source := self.sources.get(mode)) is not None:
+            lines = source()
+            return ProfileReport(mode, 0, lines, "\n".join(lines))
+
+        if self.running:
+            raise UserInputError("A profiler is already running.")
+
+        async with self._lock:
+            if mode == 'cpu':
+                return await self.profile_cpu(seconds)
+            elif mode == 'memory':
+                return await self.profile_memory(seconds)
+
+        raise UserInputError(f"Unknown profiler mode {mode}.")
+
+    async def profile_cpu(self, seconds: float) -> ProfileReport:
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+
+        stats = pstats.Stats(profile)
+        ranked = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)  # noqa: cumulative time
+        lines = [
+            f"{cumulative:8.3f}s {total:8.3f}s {calls:>7} {pstats.func_std_string(func)}"
+            for func, (_, calls, total, cumulative, _) in ranked[:self.top]
+        ]
+        stream = io.StringIO()
+        pstats.Stats(profile, stream=stream).sort_stats(pstats.SortKey.CUMULATIVE).print_stats()
+        return ProfileReport('cpu', seconds, lines, stream.getvalue())
+
+    async def profile_memory(self, seconds: float) -> ProfileReport:
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+
+        try:
+            if seconds > 0 or not was_tracing:
+                before = tracemalloc.take_snapshot()
+                await asyncio.sleep(seconds)
+                stats = tracemalloc.take_snapshot().compare_to(before, 'lineno')
+            else:
+                # tracing since startup, show everything that is currently allocated.
+                stats = tracemalloc.take_snapshot().statistics('lineno')
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+
+        lines = [*map(str, stats[:self.top])]
+        return ProfileReport('memory', seconds, lines, "\n".join(map(str, stats)))
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import heapq
+import itertools
+import logging
+import time
+import typing
+
+import discord
+
+from core.errors import MutationPending, MutationSuperseded
+from utils.general import LOGGER_NAME
+
+T = typing.TypeVar('T')
+MutationKind = typing.Literal['create', 'rename', 'delete', 'profile']
+
+
+class Budget:
+    """Calls a bucket may make in a sliding window, plus any pause discord asked for."""
+    __slots__ = ('limit', 'per', 'calls', 'paused_until')
+
+    def __init__(self, limit: int | None, per: float) -> None:
+        self.limit: int | None = limit
+        self.per: float = per
+        self.calls: collections.deque[float] = collections.deque()
+        self.paused_until: float = 0.0
+
+    def delay(self) -> float:
+        now = time.monotonic()
+        while self.calls and now - self.calls[0] >= self.per:
+            self.calls.popleft()
+
+        wait = self.paused_until - now
+        if self.limit is not None and len(self.calls) >= self.limit:
+            wait = max(wait, self.calls[0] + self.per - now)
+        return max(wait, 0.0)
+
+    def spend(self) -> None:
+        self.calls.append(time.monotonic())
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class MutationJob:
+    __slots__ = ('priority', 'sequence', 'bucket', 'key', 'kind', 'run', 'kwargs', 'future', 'dropped')
+
+    def __init__(
+            self, priority: int, sequence: int, bucket: str, key: typing.Hashable | None, kind: MutationKind,
+            run: typing.Callable[..., typing.Awaitable[typing.Any]], kwargs: dict[str, typing.Any]
+    ) -> None:
+        self.priority: int = priority
+        self.sequence: int = sequence
+        self.bucket: str = bucket
+        self.key: typing.Hashable | None = key
+        self.kind: MutationKind = kind
+        self.run: typing.Callable[..., typing.Awaitable[typing.Any]] = run
+        self.kwargs: dict[str, typing.Any] = kwargs
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.dropped: bool = False
+
+    def __lt__(self, other: MutationJob) -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class MutationScheduler:
+    """Queue for calls that change application emojis or the bot's profile.
+
+    Every bucket runs its jobs one at a time by priority, within a budget of calls. Jobs queued for the same key
+    are coalesced: a second rename or profile edit updates the queued one, and a delete drops what was queued
+    before it for that emoji.
+    """
+    PRIORITIES: dict[MutationKind, int] = {'delete': 0, 'rename': 0, 'create': 1, 'profile': 2}
+    # soft limits, discord.py still waits on the real buckets. The profile only backs off when discord asks.
+    BUDGETS: dict[str, tuple[int | None, float]] = {'emoji': (25, 10.0), 'profile': (None, 0.0)}
+    DEFAULT_TIMEOUT = 10.0
+    RATE_LIMIT_BACKOFF = 5.0
+
+    def __init__(self, budgets: dict[str, tuple[int | None, float]] | None = None) -> None:
+        self.budgets: dict[str, Budget] = {
+            bucket: Budget(limit, per) for bucket, (limit, per) in (budgets or self.BUDGETS).items()
+        }
+        self.queues: dict[str, list[MutationJob]] = {bucket: [] for bucket in self.budgets}
+        self.pending: dict[typing.Hashable, MutationJob] = {}
+        self.coalesced: int = 0
+        self._wakeups: dict[str, asyncio.Event] = {}
+        self._workers: list[asyncio.Task] = []
+        self._sequence = itertools.count()
+        self.log = logging.getLogger(f"{LOGGER_NAME}.mutations")
+
+    def start(self) -> None:
+        for bucket in self.queues:
+            self._wakeups[bucket] = asyncio.Event()
+            self._workers.append(asyncio.create_task(self.worker(bucket)))
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        for queue in self.queues.values():
+            for job in queue:
+                job.future.cancel()
+            queue.clear()
+        self.pending.clear()
+
+    def __len__(self) -> int:
+        return sum(not job.dropped for queue in self.queues.values() for job in queue)
+
+    def drop(self, job: MutationJob, reason: str) -> None:
+        job.dropped = True
+        if self.pending.get(job.key) is job:
+            del self.pending[job.key]
+        if not job.future.done():
+            job.future.set_exception(MutationSuperseded(reason))
+            job.future.add_done_callback(lambda future: future.exception())
+        self.coalesced += 1
+
+    def submit(
+            self, bucket: str, kind: MutationKind, run: typing.Callable[..., typing.Awaitable[T]], *,
+            key: typing.Hashable | None = None, **kwargs: typing.Any
+    ) -> asyncio.Future[T]:
+        """Queues run(**kwargs), jobs with the same key are coalesced while they wait."""
+        priority = self.PRIORITIES[kind]
+        if key is not None and (queued := self.pending.get(key)) is not None:
+            if queued.kind == kind and kind != 'create':
+                queued.kwargs.update(kwargs)
+                self.coalesced += 1
+                return queued.future
+
+            if kind == 'delete':
+                self.drop(queued, "The emoji was deleted before this change could be made.")
+            elif queued.kind == 'delete':
+                future = asyncio.get_running_loop().create_future()
+                future.set_exception(MutationSuperseded("The emoji is about to be deleted."))
+                return future
+
+        job = MutationJob(priority, next(self._sequence), bucket, key, kind, run, kwargs)
+        heapq.heappush(self.queues[bucket], job)
+        if key is not None:
+            self.pending[key] = job
+        if (wakeup := self._wakeups.get(bucket)) is not None:
+            wakeup.set()
+        return job.future
+
+    async def wait(self, future: asyncio.Future[T], timeout: float | None = DEFAULT_TIMEOUT) -> T:
+        """Result of a job, the job keeps going when it takes longer than timeout."""
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise MutationPending() from None
+
+    async def worker(self, bucket: str) -> None:
+        queue = self.queues[bucket]
+        budget = self.budgets[bucket]
+        wakeup = self._wakeups[bucket]
+        while True:
+            while not queue:
+                wakeup.clear()
+                await wakeup.wait()
+
+            if (delay := budget.delay()) > 0:
+                await asyncio.sleep(delay)
+                continue  # a more urgent job may have arrived while waiting.
+
+            job = heapq.heappop(queue)
+            if job.dropped:
+                continue
+
+            if self.pending.get(job.key) is job:
+                del self.pending[job.key]
+
+            budget.spend()
+            try:
+                result = await job.run(**job.kwargs)
+            except asyncio.CancelledError:
+                # stopped halfway through, it's already off the queue so stop() can't cancel it for us.
+                job.future.cancel()
+                raise
+            except (discord.RateLimited, discord.HTTPException) as e:
+                if isinstance(e, discord.HTTPException) and e.status != 429:
+                    self.fail(job, e)
+                    continue
+
+                retry_after = getattr(e, 'retry_after', None) or self.RATE_LIMIT_BACKOFF
+                self.log.warning(f"{bucket} was rate limited, retrying {job.kind} in {retry_after:.1f}s.")
+                budget.pause(retry_after)
+                heapq.heappush(queue, job)
+                if job.key is not None:
+                    self.pending.setdefault(job.key, job)
+            except Exception as e:
+                self.fail(job, e)
+            else:
+                job.future.set_result(result)
+
+    def fail(self, job: MutationJob, error: Exception) -> None:
+        # callers that timed out no longer await the job, so it's logged here too.
+        self.log.warning(f"{job.kind} job failed: {error!r}")
+        job.future.set_exception(error)
+        job.future.add_done_callback(lambda future: future.exception())
@@ -1,6 +1,7 @@
 import asyncio
+import functools
 import io
-import re
+import time
 import traceback
 from typing import Any, TypeVar, Generic, Sequence, List
 
@@ -8,11 +9,10 @@ import discord
 import starlight
 
 from core import errors
-from core.errors import EmojiImageDuplicates, UserInputError
+from core.errors import UserInputError
 from core.models import PersonalEmoji, DownloadedEmoji
 from core.typings import EInteraction, EContext
-from utils.general import emoji_context, slash_context
-from utils.parsers import VALID_EMOJI_SEMI, VALID_EMOJI_NORMAL
+from utils.general import emoji_context, slash_context, LazyPages, chunk_lines
 
 
 class ContextModal(discord.ui.Modal):
@@ -63,19 +63,7 @@ class TextEmojiModal(ContextModal, title="Emoji Support Text"):
         if text.strip() == "":
             raise UserInputError("You didn't write anything in the modal.")
 
-        def custom_emoji(match: re.Match) -> str:
-            if (emoji := bot.get_custom_emoji(match.group('emoji_name'))) is not None:
-                return f'{emoji:u}'
-            return match.group(0)
-
-        def normal_emoji(match: re.Match) -> str:
-            if (emoji := bot.normal_emojis.get(match.group('emoji_name'))) is not None:
-                return emoji.unicode
-            return match.group(0)
-
-        text = VALID_EMOJI_SEMI.sub(custom_emoji, text)
-        text = VALID_EMOJI_NORMAL.sub(normal_emoji, text)
-        await interaction.response.send_message(text)
+        await interaction.response.send_message(bot.render_emoji_text(text))
 
 
 class RenameEmojiModal(ContextModal, title="Emoji Edit"):
@@ -224,6 +212,8 @@ class PaginationContextView(ContextView, starlight.SimplePaginationView, Generic
 
     @discord.ui.button(emoji="<:forward:1059315487017808014>")
     async def end_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if isinstance(self.data_source, LazyPages):
+            await self.data_source.fill(None)  # the last page is only known once every item is read.
         await self.to_end(interaction)
 
 
@@ -293,6 +283,8 @@ class SaveButton(discord.ui.Button[ContextView]):
 
 
 class EmojiDownloadView(PaginationContextView[PersonalEmoji]):
+    PROGRESS_INTERVAL = 2  # seconds between progress edits while saving every emoji.
+
     def __init__(self, emojis: list[list[PersonalEmoji]]):
         super().__init__(emojis, delete_after=True)
         self.save_button = SaveButton(row=1)
@@ -300,54 +292,68 @@ class EmojiDownloadView(PaginationContextView[PersonalEmoji]):
 
     @discord.ui.button(label="Save All", row=1, style=discord.ButtonStyle.blurple)
     async def button_save_all(self, interaction: EInteraction, button: discord.ui.Button):
-        # TODO: Add pagination for long emoji downloads.
         button.disabled = True
         self.save_button.disabled = True
         all_emojis = [emoji for emoji, in self.data_source if emoji.id not in self.save_button.emoji_downloaded]
-
-        saved = []
-        saved_mapping = set()
         await interaction.response.send_message(f"Saving `{len(all_emojis)}` emojis...", ephemeral=True)
         await self.message.edit(view=self)
-        dups = []
-        for target_emoji in all_emojis:
-            try:
-                emoji = await interaction.client.save_emoji(target_emoji, interaction.user)
-            except EmojiImageDuplicates as e:
-                dups.append(e)
-                continue
-            except Exception as e:
-                traceback.print_exc()
-                continue
+        last_edit = time.monotonic()
+
+        async def show_progress(importer) -> None:
+            nonlocal last_edit
+            if importer.done < importer.total and time.monotonic() - last_edit < self.PROGRESS_INTERVAL:
+                return
 
+            last_edit = time.monotonic()
+            try:
+                await interaction.edit_original_response(
+                    content=f"Saving emojis `{importer.done}/{importer.total}`. Saved `{len(importer.saved)}`, "
+                            f"`{len(importer.duplicates)}` duplicate(s), `{importer.failures}` failed."
+                )
+            except discord.HTTPException:
+                pass  # the summary is still sent once every emoji is saved.
+
+        importer = await interaction.client.bulk_save_emojis(all_emojis, interaction.user, show_progress)
+        saved = [emoji for _, emoji in importer.saved]
+        for target_emoji, emoji in importer.saved:
             self.save_button.emoji_downloaded[target_emoji.id] = emoji
-            saved_mapping.add(target_emoji.id)
-            saved.append(emoji)
-        non_error_set = {*saved_mapping, *[emote.emoji.id for emote in dups]}
-        failed = [emoji for emoji in all_emojis if emoji.id not in non_error_set]
-        extras = ["", ""]
+
+        failed_downloads = [emoji for emoji, _ in importer.failed_downloads]
+        failed = [emoji for emoji, _ in importer.failed]
+        dups = importer.duplicates
+        lines = []
+        extra = ""
+        if failed_downloads:
+            extra += f", failed to download {len(failed_downloads)} emoji(s)"
+            lines.append("**List of failed downloads:**")
+            lines.extend(f"- {e.name}" for e in failed_downloads)
+
         if failed:
-            failures = '\n'.join([f"- {e.name}" for e in failed])
-            extras = [
-                f" and failed to download {len(failed)} emoji(s).",
-                f"\n\n**List of failed downloads:**\n{failures}"
-            ]
+            extra += f", failed to save {len(failed)} emoji(s)"
+            lines.append("**List of failed saves:**")
+            lines.extend(f"- {e.name}" for e in failed)
 
         if dups:
-            duplicates = "\n".join([f"- {err.emoji.name}" for err in dups])
-            extras[1] += (f"\nFound `{len(dups)}` duplicate(s)! Refusing to add them. "
-                          f"You can manually save them by pressing the save button!. \n**List of duplicates:**\n{duplicates}")
+            lines.append(f"Found `{len(dups)}` duplicate(s)! Refusing to add them. "
+                         f"You can manually save them by pressing the save button!. \n**List of duplicates:**")
+            lines.extend(f"- {err.emoji.name}" for err in dups)
 
         if saved:
-            success = '\n'.join([f"- {e}: {e.name}" for e in saved])
-            content = (f"Downloaded {len(saved)} emojis{extras[0]}\n"
-                       f"**List of downloaded emojis:**\n{success}{extras[1]}")
+            content = f"Saved {len(saved)} emojis{extra}."
+            lines[:0] = ["**List of saved emojis:**", *[f"- {e}: {e.name}" for e in saved]]
+        else:
+            content = f"No emoji was successfully saved{extra}."
+
+        if interaction.is_expired():
+            # the interaction token only lasts 15 minutes, a longer save reports to the channel instead.
+            await interaction.channel.send(f"{interaction.user.mention} {content}")
+            send = interaction.channel.send
         else:
-            if not failed:
-                extras[0] = "."
+            await interaction.edit_original_response(content=content)
+            send = functools.partial(interaction.followup.send, ephemeral=True)
 
-            content = f"No emoji was successfully saved{extras[0]}{extras[1]}"
-        await interaction.edit_original_response(content=content)
+        for chunk in chunk_lines(lines):
+            await send(chunk)
 
 
 class SelectEmojiPagination(PaginationContextView):
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import collections
+import time
+import typing
+
+from core.metrics import CACHE_REQUESTS
+
+if typing.TYPE_CHECKING:
+    from core.models import PersonalEmoji
+
+
+class UserState:
+    """Everything the bot remembers about a single user, dropped as a whole when the user is evicted."""
+    __slots__ = (
+        'user_id', 'usages', 'favourites', 'past_sent', 'ensured', 'usage_loaded', 'favourite_loaded',
+        'favourite_changes',
+    )
+
+    def __init__(self, user_id: int) -> None:
+        self.user_id: int = user_id
+        self.usages: dict[int, int] = {}
+        self.favourites: set[int] = set()
+        self.past_sent: collections.deque[PersonalEmoji] | None = None
+        self.ensured: bool = False
+        # monotonic time of the last load from the database, writes by the bot itself go through in between.
+        self.usage_loaded: float | None = None
+        self.favourite_loaded: float | None = None
+        # favourites changed while they're being loaded, reapplied over what the database returned.
+        self.favourite_changes: dict[int, bool] | None = None
+
+    def set_favourite(self, emoji_id: int, favourite: bool) -> None:
+        if favourite:
+            self.favourites.add(emoji_id)
+        else:
+            self.favourites.discard(emoji_id)
+
+        if self.favourite_changes is not None:
+            self.favourite_changes[emoji_id] = favourite
+
+    def load_favourites(self, emoji_ids: typing.Iterable[int]) -> None:
+        favourites = set(emoji_ids)
+        for emoji_id, favourite in (self.favourite_changes or {}).items():
+            if favourite:
+                favourites.add(emoji_id)
+            else:
+                favourites.discard(emoji_id)
+        self.favourites = favourites
+
+    def sent(self, emoji: PersonalEmoji) -> None:
+        if self.past_sent is None:
+            self.past_sent = collections.deque(maxlen=10)
+        self.past_sent.append(emoji)
+
+
+class UserStateCache:
+    """Per user state bounded by an amount of users, the least recently used user is evicted first.
+
+    An evicted user's usages and favourites are loaded from the database again the next time they're needed,
+    and so are users whose data was loaded more than ttl seconds ago.
+    """
+
+    def __init__(self, *, max_users: int, ttl: float | None = None) -> None:
+        self.max_users: int = max_users
+        self.ttl: float | None = ttl
+        self.evictions: int = 0
+        self._states: collections.OrderedDict[int, UserState] = collections.OrderedDict()
+
+    def get(self, user_id: int) -> UserState:
+        """State of a user, created when the user has none. Marks the user as recently used."""
+        if (state := self._states.get(user_id)) is not None:
+            CACHE_REQUESTS.inc(cache="user_state", result="hit")
+            self._states.move_to_end(user_id)
+            return state
+
+        CACHE_REQUESTS.inc(cache="user_state", result="miss")
+        state = self._states[user_id] = UserState(user_id)
+        while len(self._states) > self.max_users:
+            self._states.popitem(last=False)
+            self.evictions += 1
+        return state
+
+    def peek(self, user_id: int) -> UserState | None:
+        """State of a user without creating it or changing its recency, for lookups and write throughs."""
+        return self._states.get(user_id)
+
+    def fresh(self, loaded_at: float | None) -> bool:
+        return loaded_at is not None and (self.ttl is None or time.monotonic() - loaded_at < self.ttl)
+
+    def forget_emoji(self, emoji_id: int) -> None:
+        for state in self._states.values():
+            state.usages.pop(emoji_id, None)
+            state.favourites.discard(emoji_id)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def report_lines(self) -> list[str]:
+        states = self._states.values()
+        return [
+            f"{'users':<20} {len(self._states):>8} / {self.max_users}",
+            f"{'evicted':<20} {self.evictions:>8}",
+            f"{'usages loaded':<20} {sum(self.fresh(state.usage_loaded) for state in states):>8}",
+            f"{'favourites loaded':<20} {sum(self.fresh(state.favourite_loaded) for state in states):>8}",
+            f"{'usage entries':<20} {sum(len(state.usages) for state in states):>8}",
+            f"{'favourite entries':<20} {sum(len(state.favourites) for state in states):>8}",
+            f"{'recent emojis':<20} {sum(len(state.past_sent or ()) for state in states):>8}",
+        ]
@@ -1,18 +1,27 @@
+from utils.importtime import import_timer
+import_timer.install()  # noqa: must run before everything else is imported.
+
+import os
+import tempfile
+import time
 import tracemalloc
+import typing
 
 import discord
 import starlight
 from discord import app_commands
 from discord.ext import commands
 
+from core.archive import EmojiArchiveExporter, EmojiArchiveImporter
 from core.client import StellaEmojiBot
 from core.converter import PersonalEmojiModel, FavouriteEmojiModel, SearchEmojiModel
 from core.errors import UserInputError
 from core.typings import EContext
-from utils.general import inline_pages, describe
+from utils.general import inline_pages, describe, chunk_lines
 from utils.parsers import env, TOKEN_REGEX, FuzzyInsensitive
 
-tracemalloc.start()
+if env("TRACEMALLOC_STARTUP", bool, default=False):
+    tracemalloc.start()
 bot = StellaEmojiBot()
 
 @bot.hybrid_command()
@@ -72,21 +81,101 @@ async def sync(ctx: EContext, guild: discord.Guild | None = None):
 
 @bot.command()
 @commands.is_owner()
-async def profiler(ctx: EContext):
-    """Profiler for developers."""
-    snapshot = tracemalloc.take_snapshot()
-    top_stats = snapshot.statistics('lineno')
-    async for page in inline_pages(top_stats, ctx):
-        desc = "\n".join(map(str, page.item.data))
+async def profiler(
+        ctx: EContext, mode: typing.Literal['cpu', 'memory', 'db', 'cache'] = 'memory',
+        seconds: commands.Range[int, 0, 600] = 10, as_file: bool = False
+):
+    """Profiler for developers. Profiles cpu or memory allocations for a given amount of seconds.
+
+    db mode reports query timings collected since startup, cache mode reports the size of the per user caches."""
+    if mode not in bot.profiler.sources:
+        await ctx.send(f"Profiling {mode} for {seconds} second(s).")
+    report = await bot.profiler.profile(mode, seconds)
+    if as_file:
+        await ctx.send(file=report.to_file())
+        return
+
+    async for page in inline_pages(report.lines, ctx):
+        desc = "\n".join(page.item.data)
+        page.embed.title = f"{mode.title()} profile ({report.seconds}s)"
         page.embed.description = f"```\n{desc}\n```"
 
 
-token = env("BOT_TOKEN")
-if not token:
-    raise RuntimeError("BOT_TOKEN was not filled. Did you forget to fill it in? This is required.")
-elif TOKEN_REGEX.match(token) is None:
-    raise RuntimeError("BOT_TOKEN has an incorrect token pattern. Is this the correct token you copied? "
-                       "The format of your bot's token should be XXXXXXXXXXXXXXXXXXX.XXXXXX.XXXXXX")
+@bot.command()
+@commands.is_owner()
+async def export(ctx: EContext, path: str | None = None):
+    """Exports every emoji with its owner, hash, favourites and usages into a zip archive.
+
+    The archive is kept at path and also sent here when it's small enough for discord."""
+    path = path or f"emojis-{discord.utils.utcnow():%Y%m%d-%H%M%S}.zip"
+    await ctx.send(f"Exporting {len(bot.emojis_users)} emoji(s) into `{path}`.")
+    exporter = EmojiArchiveExporter(bot, concurrency=env("ARCHIVE_CONCURRENCY", int, default=4))
+    await exporter.export(path)
+    content = f"Exported `{exporter.exported}` emoji(s) into `{path}`, `{len(exporter.failed)}` failed."
+    limit = ctx.guild.filesize_limit if ctx.guild is not None else 10 * 1024 ** 2
+    if os.path.getsize(path) > limit:
+        await ctx.send(f"{content} The archive is too large to upload.")
+        return
+
+    await ctx.send(content, file=discord.File(path))
 
 
-bot.starter(token)
+@bot.command(name="import")
+@commands.is_owner()
+async def import_archive(ctx: EContext, path: str | None = None):
+    """Imports the emojis of an archive made by export, attached or from a local path. Duplicates are skipped."""
+    if path is None and not ctx.message.attachments:
+        raise UserInputError("Attach an emoji archive or give the path of one.")
+
+    message = await ctx.send("Importing emojis.")
+    last_edit = time.monotonic()
+
+    async def show_progress(importer: EmojiArchiveImporter) -> None:
+        nonlocal last_edit
+        if time.monotonic() - last_edit < 5:
+            return
+
+        last_edit = time.monotonic()
+        try:
+            await message.edit(
+                content=f"Importing emojis `{importer.done}/{importer.expected or '?'}`. "
+                        f"Saved `{len(importer.saved)}`, `{len(importer.duplicates)}` duplicate(s), "
+                        f"`{importer.failures}` failed."
+            )
+        except discord.HTTPException:
+            pass  # the summary is sent once the import is done.
+
+    with tempfile.TemporaryDirectory() as directory:
+        if path is None:
+            path = os.path.join(directory, "import.zip")
+            await ctx.message.attachments[0].save(path)
+
+        importer = await EmojiArchiveImporter(bot, ctx.author).import_archive(path, show_progress)
+
+    await message.edit(
+        content=f"Imported `{len(importer.saved)}/{importer.total}` emoji(s), "
+                f"`{len(importer.duplicates)}` duplicate(s), `{importer.failures}` failed."
+    )
+    lines = []
+    if importer.duplicates:
+        lines.append("**List of duplicates:**")
+        lines.extend(f"- {err.emoji.name}: {err.similars[0][0]}" for err in importer.duplicates)
+    if importer.failed_downloads:
+        lines.append("**List of failed downloads:**")
+        lines.extend(f"- {emoji.name}: {error}" for emoji, error in importer.failed_downloads)
+    if importer.failed:
+        lines.append("**List of failed saves:**")
+        lines.extend(f"- {emoji.name}: {error}" for emoji, error in importer.failed)
+    for chunk in chunk_lines(lines):
+        await ctx.send(chunk)
+
+
+if __name__ == "__main__":
+    token = env("BOT_TOKEN")
+    if not token:
+        raise RuntimeError("BOT_TOKEN was not filled. Did you forget to fill it in? This is required.")
+    elif TOKEN_REGEX.match(token) is None:
+        raise RuntimeError("BOT_TOKEN has an incorrect token pattern. Is this the correct token you copied? "
+                           "The format of your bot's token should be XXXXXXXXXXXXXXXXXXX.XXXXXX.XXXXXX")
+
+    bot.starter(token)
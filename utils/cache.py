@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import time
+import typing
+
+K = typing.TypeVar("K")
+V = typing.TypeVar("V")
+
+
+class LRUCache(typing.Generic[K, V]):
+    """Least recently used cache bounded by size, entries older than ttl seconds count as a miss."""
+
+    def __init__(self, *, maxsize: int, ttl: float | None = None) -> None:
+        self.maxsize: int = maxsize
+        self.ttl: float | None = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._entries: collections.OrderedDict[K, tuple[float, V]] = collections.OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None or (self.ttl is not None and time.monotonic() - entry[0] > self.ttl):
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: K, value: V) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: K) -> V | None:
+        entry = self._entries.pop(key, None)
+        return None if entry is None else entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._entries
+
+
+class SingleFlight(typing.Generic[K, V]):
+    """Runs at most one call per key, callers asking for a key already in flight await that same call."""
+
+    def __init__(self) -> None:
+        self.joined: int = 0
+        self._calls: dict[K, asyncio.Task[V]] = {}
+
+    async def run(self, key: K, func: typing.Callable[[K], typing.Awaitable[V]]) -> V:
+        if (task := self._calls.get(key)) is not None:
+            self.joined += 1
+        else:
+            task = self._calls[key] = asyncio.create_task(func(key))
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+
+        # a caller being cancelled shouldn't cancel the call for everyone else waiting on it.
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._calls)
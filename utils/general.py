@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 import contextvars
+import heapq
 import inspect
 import itertools
 import logging
 import re
 import typing
-from typing import AsyncGenerator
+from typing import AsyncGenerator, AsyncIterable, Iterable, Sequence
 
 import discord
 import starlight
@@ -70,24 +71,112 @@ async def iter_pagination(
         yield next(counter), item
 
 
+class LazyPages(typing.Generic[T]):
+    """Pages of items that are only chunked once they're needed.
+
+    Sequences are sliced per page. Iterators and async iterators are read up to a window of pages past the
+    furthest page visited, so the total is only known once they run out.
+    """
+
+    def __init__(self, items: Iterable[T] | AsyncIterable[T], per_page: int, *, lookahead: int = 2) -> None:
+        self.per_page: int = per_page
+        self.lookahead: int = lookahead
+        self._sequence: Sequence[T] | None = items if isinstance(items, Sequence) else None
+        self._iterator: typing.Iterator[T] | typing.AsyncIterator[T] | None = None
+        if self._sequence is None:
+            self._iterator = aiter(items) if isinstance(items, AsyncIterable) else iter(items)
+        self._pages: list[list[T]] = []
+
+    @property
+    def exhausted(self) -> bool:
+        return self._iterator is None
+
+    @property
+    def total_label(self) -> str:
+        """Amount of pages, with a + while there may be more."""
+        return f"{len(self)}" if self.exhausted else f"{len(self)}+"
+
+    def __len__(self) -> int:
+        if self._sequence is not None:
+            return -(-len(self._sequence) // self.per_page)
+        return len(self._pages)
+
+    def __getitem__(self, index: int) -> Sequence[T]:
+        if self._sequence is None:
+            return self._pages[index]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._sequence[index * self.per_page:(index + 1) * self.per_page]
+
+    async def fill(self, page: int | None) -> None:
+        """Reads the iterator up to the window after page, or until it runs out when page is None."""
+        while not self.exhausted and (page is None or len(self._pages) <= page + self.lookahead):
+            chunk = await self._read_chunk()
+            if chunk:
+                self._pages.append(chunk)
+            if len(chunk) < self.per_page:
+                self._iterator = None
+
+    async def _read_chunk(self) -> list[T]:
+        iterator = self._iterator
+        if not isinstance(iterator, typing.AsyncIterator):
+            return [*itertools.islice(iterator, self.per_page)]
+
+        chunk = []
+        while len(chunk) < self.per_page:
+            try:
+                chunk.append(await anext(iterator))
+            except StopAsyncIteration:
+                break
+        return chunk
+
+
 async def inline_pages(
-        items: list[T], ctx: EContext, per_page: int = 6, cls: type[V] = None,
-        **kwargs
+        items: Iterable[T] | AsyncIterable[T], ctx: EContext, per_page: int = 6, cls: type[V] = None,
+        *, lookahead: int = 2, **kwargs
 ) -> AsyncGenerator[PageItem[T, V], None]:
-    chunks = [*discord.utils.as_chunks(items, per_page)]
-    page_size = len(chunks)
+    pages = LazyPages(items, per_page, lookahead=lookahead)
+    await pages.fill(0)
     if cls is None:
         from core.ui_components import PaginationContextView
         cls = PaginationContextView
 
-    view = cls(chunks, **kwargs)
+    view = cls(pages, **kwargs)
     async for i, item in iter_pagination(view, ctx):
         embed = discord.Embed()
-        embed.set_footer(text=f"Page {view.current_page + 1}/{page_size}")
+        embed.set_footer(text=f"Page {view.current_page + 1}/{pages.total_label}")
         yield PageItem(view, i, item, embed)
 
         if not item._future.done():
             item.format(embed=embed)
+        await pages.fill(view.current_page)
+
+
+def iter_sorted(items: Iterable[T], key: typing.Callable[[T], float], *, reverse: bool = False) -> typing.Iterator[T]:
+    """Yields items in the order list.sort would put them, only as much of the order as is read is worked out."""
+    sign = -1 if reverse else 1
+    heap = [(sign * key(item), index, item) for index, item in enumerate(items)]
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def chunk_lines(lines: Iterable[str], limit: int = 2000) -> list[str]:
+    """Joins lines into as few messages as possible that are within the limit, longer lines are cut."""
+    chunks = []
+    current = ""
+    for line in lines:
+        line = line[:limit]
+        if current and len(current) + len(line) + 1 > limit:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
 
 
 # thx danny for this func :3
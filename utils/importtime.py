@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import importlib.abc
+import logging
+import sys
+import time
+
+# Stacks that should only be imported when they're actually used.
+HEAVY_MODULES = ('imagehash', 'scipy', 'numpy', 'pywt', 'PIL', 'asyncpg', 'asqlite')
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """Records how long each top level module took to import, including the imports it triggers."""
+
+    def __init__(self) -> None:
+        self.started: float = time.perf_counter()
+        self.timings: dict[str, float] = {}
+
+    def install(self) -> None:
+        if self not in sys.meta_path:
+            self.started = time.perf_counter()
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        if '.' in fullname or fullname in self.timings:
+            return None
+
+        index = sys.meta_path.index(self)
+        for finder in sys.meta_path[index + 1:]:
+            find_spec = getattr(finder, 'find_spec', None)
+            if find_spec is None:
+                continue
+
+            spec = find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        loader = spec.loader
+        # shared loaders such as BuiltinImporter are classes, patching those would time every module.
+        if loader is None or isinstance(loader, type) or not hasattr(loader, 'exec_module'):
+            return spec
+
+        exec_module = loader.exec_module
+
+        def timed_exec_module(module):
+            start = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                self.timings[fullname] = time.perf_counter() - start
+
+        try:
+            loader.exec_module = timed_exec_module
+        except AttributeError:
+            pass
+        return spec
+
+    def heavy_modules(self) -> list[str]:
+        return [name for name in HEAVY_MODULES if name in sys.modules]
+
+    def report(self, logger: logging.Logger, *, top: int = 10) -> None:
+        elapsed = time.perf_counter() - self.started
+        logger.info(f"Startup import report, {elapsed * 1000:.0f}ms since the process started importing.")
+        ranked = sorted(self.timings.items(), key=lambda item: item[1], reverse=True)
+        for name, taken in ranked[:top]:
+            logger.info(f"  {name:<20} {taken * 1000:>8.1f}ms")
+
+        if heavy := self.heavy_modules():
+            logger.info(f"Heavy modules already imported: {', '.join(heavy)}")
+
+
+import_timer = ImportTimer()
@@ -48,6 +48,7 @@ def environment_boolean(name: str, value: str) -> bool:
 
 
 T = typing.TypeVar('T')
+_MISSING: typing.Any = object()
 
 @typing.overload
 def env(name: str) -> str: ...
@@ -55,12 +56,20 @@ def env(name: str) -> str: ...
 @typing.overload
 def env(name: str, data_type: type[T]) -> T: ...
 
-def env(name: str, data_type: type[T] = str) -> T:
+@typing.overload
+def env(name: str, data_type: type[T], *, default: T) -> T: ...
+
+def env(name: str, data_type: type[T] = str, *, default: T = _MISSING) -> T:
     try:
         value = os.environ[name]
     except KeyError:
+        if default is not _MISSING:
+            return default
         raise RuntimeError(f'"{name}" is not set in the environment variable. It is required.')
 
+    if value == "" and default is not _MISSING:
+        return default
+
     if data_type is bool:
         return environment_boolean(name, value)
 